@@ -1,15 +1,21 @@
+import json
 import logging
-from dataclasses import fields
+import uuid
 
-from flask import Flask, request
+from flask import Flask, Response, request
+from waitress import serve
 
+from configuration.server_type import ServerType
 from configuration.web_configuration import WebConfiguration
-from contracts.github_webhook import GithubWebhook
+from contracts.comment_event import CommentEvent
 from contracts.pr_url import PrUrl
-from contracts.gitea_webhook import GiteaWebhook
 from contracts.review_task import ReviewTask
+from services.delivery_tracker import DeliveryTracker
+from services.git_service import GitService
 from services.gitea_service import GiteaService
 from services.github_service import GithubService
+from services.metrics_service import MetricsService
+from services.tracing_service import TracingService
 from services.queue.task_queue import TaskQueue
 from services.review_service import ReviewService
 
@@ -22,9 +28,12 @@ class Api:
     and processing code review requests.
     """
     START_REVIEW_COMMAND: str = "/start_review"
+    FULL_REVIEW_FLAG: str = "--full"
+    COMMAND_MARKER: bytes = START_REVIEW_COMMAND.encode("utf-8")
 
     def __init__(self, configuration: WebConfiguration, gitea_service: GiteaService, review_service: ReviewService, queue: TaskQueue,
-                github_service: GithubService):
+                github_service: GithubService, delivery_tracker: DeliveryTracker, metrics: MetricsService,
+                tracing: TracingService):
         """
         Initialize the API with required services and configuration.
         
@@ -34,14 +43,21 @@ class Api:
             review_service (ReviewService): Service for performing code reviews
             queue (TaskQueue): Queue for review tasks
             github_service (GithubService): Service for GitHub interactions
+            delivery_tracker (DeliveryTracker): Set of seen webhook deliveries, used to ignore redeliveries
+            metrics (MetricsService): Collector of service metrics, exposed on `/metrics`
+            tracing (TracingService): Writer of review traces, which start when a review is requested
         """
         self.configuration = configuration
         self.gitea_service = gitea_service
         self.github_service = github_service
         self.review_service = review_service
         self.queue = queue
+        self.delivery_tracker = delivery_tracker
+        self.metrics = metrics
+        self.tracing = tracing
         self.logger = logging.getLogger(Api.__name__)
         self.app = Flask(__name__)
+        self.app.config["MAX_CONTENT_LENGTH"] = configuration.max_content_length_kb * 1024
         self.app.before_request(self.__require_api_auth)
         self.__configure_routes()
 
@@ -49,111 +65,132 @@ class Api:
         """
         Start the API web server.
         
-        Runs the Flask application with the configured host and port.
+        Serves the Flask application with the configured host and port by the waitress server
+        (a fixed pool of request threads behind a bounded listen backlog) or by the Flask development server.
+        Both run in the current process, so the task queue is shared with the worker pool.
         """
-        self.app.run(host=self.configuration.host, port=self.configuration.port)
+        if self.configuration.server == ServerType.Development:
+            self.app.run(host=self.configuration.host, port=self.configuration.port, threaded=True)
+            return
+        self.logger.info("Starting waitress server on %s:%s (threads=%s, backlog=%s)", self.configuration.host, self.configuration.port,
+                         self.configuration.threads, self.configuration.backlog)
+        serve(self.app, host=self.configuration.host, port=self.configuration.port, threads=self.configuration.threads,
+              backlog=self.configuration.backlog, connection_limit=self.configuration.connection_limit)
 
     def __configure_routes(self):
         """
         Configure API routes for webhook endpoints.
         
-        Sets up routes for Gitea and GitHub webhook handlers.
+        Sets up routes for Gitea and GitHub webhook handlers and the metrics endpoint.
         """
         self.app.add_url_rule("/webhook/gitea",  view_func=self.__gitea_webhook_route, methods=["POST"])
         self.app.add_url_rule("/webhook/github",  view_func=self.__github_webhook_route, methods=["POST"])
+        self.app.add_url_rule("/metrics",  view_func=self.__metrics_route, methods=["GET"])
 
     def __require_api_auth(self):
         """
         Middleware for API authentication.
         
         Verifies the request contains a valid API token.
+        The metrics endpoint is protected by `metrics_token` instead (open if it is empty), so scrapers do not hold the webhook token.
         """
+        expected_token = self.configuration.token
+        if request.path == "/metrics":
+            if not self.configuration.metrics_token:
+                return
+            expected_token = self.configuration.metrics_token
         token = request.args.get("token")
-        if token is not None and token == self.configuration.token:
+        if token is not None and token == expected_token:
             return
         bearer = request.headers.get("Authorization")
         if bearer is None or bearer == "" or not "Bearer" in bearer:
             return "Unauthorized", 401
         token = bearer.split()[1]
-        if token == self.configuration.token:
+        if token == expected_token:
             return
         return "Unauthorized", 401
     
-    def __ensure_gitea_comment_event(self) -> GiteaWebhook:
-        """
-        Validate and parse Gitea comment webhook event.
-        
-        Returns:
-            GiteaWebhook: Parsed webhook data if valid, None otherwise
-        """
-        gitea_event = request.headers.get("X-Gitea-Event", None)
-        if gitea_event is None or gitea_event != "issue_comment":
-            return None
-        request_json = request.get_json()
-        webhook_fields = {f.name for f in fields(GiteaWebhook)}
-        return GiteaWebhook(**{k: v for k, v in request_json.items() if k in webhook_fields})
-    
-    def __ensure_github_comment_event(self) -> GithubWebhook:
-        """
-        Validate and parse GitHub comment webhook event.
-        
-        Returns:
-            GithubWebhook: Parsed webhook data if valid, None otherwise
-        """
-        github_event = request.headers.get("X-Github-Event", None)
-        if github_event is None or github_event != "issue_comment":
-            return None
-        request_json = request.get_json()
-        return GithubWebhook(**request_json)
-    
-    def __process_review_request(self, pull_request_url: str, git_service: str, comment_body: str) -> None:
+    def __process_review_request(self, pull_request_url: str, pr_url: PrUrl, git_service: str, comment_body: str) -> None:
         """
         Process a review request from a webhook.
         
         Args:
             pull_request_url (str): URL of the pull request to review
+            pr_url (PrUrl): Parsed URL of the pull request
             git_service (str): Name of the Git service (gitea/github)
             comment_body (str): The comment that triggered the review
         """
         self.logger.info("Processing command: %s", comment_body)
         user_message = comment_body.replace(self.START_REVIEW_COMMAND, "").strip()
-        review_task = ReviewTask(pull_request_url, git_service, user_message if len(user_message) > 5 else None)
-        self.queue.enqueue(review_task)
-        pr_url = PrUrl.create_from_url(pull_request_url)
-        self.logger.info("%s Review %s/%s #%s enqueued", git_service.upper(), pr_url.owner, pr_url.repo, pr_url.pr_number)
+        full_review = user_message.startswith(self.FULL_REVIEW_FLAG)
+        if full_review:
+            user_message = user_message[len(self.FULL_REVIEW_FLAG):].strip()
+        review_task = ReviewTask(pull_request_url, git_service, user_message if len(user_message) > 5 else None, full_review,
+                                 trace_id=uuid.uuid4().hex)
+        with self.tracing.span("enqueue", "api", trace_id=review_task.trace_id, git_service=git_service):
+            self.queue.enqueue(review_task)
+        self.logger.info("%s Review %s/%s #%s enqueued (trace %s)", git_service.upper(), pr_url.owner, pr_url.repo, pr_url.pr_number, review_task.trace_id)
     
     # Routes
 
+    def __metrics_route(self):
+        return Response(self.metrics.render(), mimetype="text/plain; version=0.0.4")
+
     def __gitea_webhook_route(self):
-        webhook = self.__ensure_gitea_comment_event()
-        if webhook is None:
-            return "Not allowed event %s" %(request.headers.get("X-Gitea-Event", None)), 400 
-        if webhook.action != "created" or webhook.comment is None:
-            return "Is not comment create event. Ignore event", 200 
-        if not webhook.comment.body.startswith(self.START_REVIEW_COMMAND):
-            return "Comment not start with /start_review. Ignore event", 200
-        user_email = webhook.comment.user.email if webhook.comment.user is not None else ""
-        if not self.gitea_service.is_allowed_user(user_email):
-            fail_response = f"User {user_email} not allowed to start review"
-            self.logger.warning(fail_response)
-            return fail_response, 403
-        
-        self.__process_review_request(webhook.comment.pull_request_url, "gitea", webhook.comment.body)
-        return "Review task enqueued", 200
+        return self.__comment_webhook_route("gitea", "X-Gitea-Event", "X-Gitea-Delivery", CommentEvent.create_from_gitea, self.gitea_service)
     
     def __github_webhook_route(self):
-        webhook = self.__ensure_github_comment_event()
-        if webhook is None:
-            return "Not allowed event %s" %(request.headers.get("X-Github-Event", None)), 400 
-        if webhook.action != "created" or webhook.comment is None:
+        return self.__comment_webhook_route("github", "X-Github-Event", "X-GitHub-Delivery", CommentEvent.create_from_github, self.github_service)
+
+    def __comment_webhook_route(self, git_service: str, event_header: str, delivery_header: str, create, service: GitService):
+        """
+        Handle a comment webhook, reading only the fields used to start a review.
+        
+        Most comments are not review commands, so they are rejected by a search of the raw body
+        before the JSON is decoded. Bodies above `max_content_length_kb` are rejected by Flask with 413.
+        
+        Args:
+            git_service (str): Name of the Git service (gitea/github)
+            event_header (str): Header with the event type
+            delivery_header (str): Header with the delivery id (the same for redeliveries)
+            create (Callable[[dict], CommentEvent]): Factory reading the event from the payload
+            service (GitService): Service checking the user allowed to start a review
+        """
+        if request.headers.get(event_header, None) != "issue_comment":
+            return "Not allowed event %s" %(request.headers.get(event_header, None)), 400 
+        data = request.get_data(cache=False)
+        if self.COMMAND_MARKER not in data:
+            return "Comment not start with /start_review. Ignore event", 200
+        try:
+            payload = json.loads(data)
+        except ValueError:
+            return "Invalid webhook payload", 400
+        if not isinstance(payload, dict):
+            return "Invalid webhook payload", 400
+        # Fields of an unexpected type (e.g. `"comment": "text"` or `"body": 5`) are read as missing
+        event = create(payload)
+        if event.action != "created":
             return "Is not comment create event. Ignore event", 200 
-        if not webhook.comment.body.startswith(self.START_REVIEW_COMMAND):
+        if not event.body.startswith(self.START_REVIEW_COMMAND):
             return "Comment not start with /start_review. Ignore event", 200
-        user_login = webhook.comment.user.login if webhook.comment.user is not None else ""
-        if not self.github_service.is_allowed_user(user_login):
-            fail_response = f"User {user_login} not allowed to start review"
+        if event.pull_request_url is None:
+            return "Is not pull request comment. Ignore event", 200
+        try:
+            pr_url = PrUrl.create_from_url(event.pull_request_url)
+        except ValueError:
+            return "Invalid pull request url %s" %(event.pull_request_url), 400
+        if not service.is_allowed_user(event.user):
+            fail_response = f"User {event.user} not allowed to start review"
             self.logger.warning(fail_response)
             return fail_response, 403
-                
-        self.__process_review_request(webhook.issue.pull_request.html_url, "github", webhook.comment.body)
+        
+        delivery_id = request.headers.get(delivery_header, None)
+        if not self.delivery_tracker.add(delivery_id):
+            self.logger.info("Delivery %s already received. Ignore redelivery", delivery_id)
+            return "Delivery already received. Ignore event", 200
+        try:
+            self.__process_review_request(event.pull_request_url, pr_url, git_service, event.body)
+        except Exception:
+            self.delivery_tracker.discard(delivery_id)
+            raise
         return "Review task enqueued", 200
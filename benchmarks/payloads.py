@@ -0,0 +1,98 @@
+import json
+
+def github_user(login: str) -> dict:
+    """
+    Build the `user` object of a GitHub webhook payload, with all fields GitHub sends.
+
+    Args:
+        login (str): User login
+
+    Returns:
+        dict: User object
+    """
+    url = f"https://api.github.com/users/{login}"
+    return {
+        "login": login, "id": 1000001, "node_id": "MDQ6VXNlcjEwMDAwMDE=", "avatar_url": "https://avatars.githubusercontent.com/u/1000001?v=4",
+        "gravatar_id": "", "url": url, "html_url": f"https://github.com/{login}", "followers_url": f"{url}/followers",
+        "following_url": f"{url}/following{{/other_user}}", "gists_url": f"{url}/gists{{/gist_id}}", "starred_url": f"{url}/starred{{/owner}}{{/repo}}",
+        "subscriptions_url": f"{url}/subscriptions", "organizations_url": f"{url}/orgs", "repos_url": f"{url}/repos",
+        "events_url": f"{url}/events{{/privacy}}", "received_events_url": f"{url}/received_events", "type": "User",
+        "user_view_type": "public", "site_admin": False,
+    }
+
+def github_repository(owner: str, name: str) -> dict:
+    """
+    Build the `repository` object of a GitHub webhook payload, with all fields GitHub sends.
+
+    Args:
+        owner (str): Owner login
+        name (str): Repository name
+
+    Returns:
+        dict: Repository object
+    """
+    url = f"https://api.github.com/repos/{owner}/{name}"
+    repository = {
+        "id": 2000002, "node_id": "R_kgDOAAAAAA", "name": name, "full_name": f"{owner}/{name}", "private": False, "owner": github_user(owner),
+        "html_url": f"https://github.com/{owner}/{name}", "description": "Repository used by the webhook benchmark", "fork": False, "url": url,
+        "created_at": "2024-01-01T00:00:00Z", "updated_at": "2024-06-01T00:00:00Z", "pushed_at": "2024-06-01T00:00:00Z",
+        "git_url": f"git://github.com/{owner}/{name}.git", "ssh_url": f"git@github.com:{owner}/{name}.git",
+        "clone_url": f"https://github.com/{owner}/{name}.git", "svn_url": f"https://github.com/{owner}/{name}", "homepage": None,
+        "size": 1024, "stargazers_count": 10, "watchers_count": 10, "language": "Python", "has_issues": True, "has_projects": True,
+        "has_downloads": True, "has_wiki": True, "has_pages": False, "has_discussions": False, "forks_count": 1, "mirror_url": None,
+        "archived": False, "disabled": False, "open_issues_count": 3, "license": None, "allow_forking": True, "is_template": False,
+        "web_commit_signoff_required": False, "topics": ["review", "ai"], "visibility": "public", "forks": 1, "open_issues": 3,
+        "watchers": 10, "default_branch": "main",
+    }
+    for relation in ("forks", "keys", "collaborators", "teams", "hooks", "issue_events", "events", "assignees", "branches", "tags", "blobs",
+                     "git_tags", "git_refs", "trees", "statuses", "languages", "stargazers", "contributors", "subscribers", "subscription",
+                     "commits", "git_commits", "comments", "issue_comment", "contents", "compare", "merges", "archive", "downloads",
+                     "issues", "pulls", "milestones", "notifications", "labels", "releases", "deployments"):
+        repository[f"{relation}_url"] = f"{url}/{relation}"
+    return repository
+
+def github_comment_payload(body: str, pr_number: int = 1, owner: str = "octo-org", repo: str = "service") -> bytes:
+    """
+    Build the body of a GitHub `issue_comment` webhook of a pull request comment.
+
+    The payload has the same shape and roughly the same size (about 13 KB) as a real delivery.
+
+    Args:
+        body (str): Comment text
+        pr_number (int): Pull request number
+        owner (str): Repository owner
+        repo (str): Repository name
+
+    Returns:
+        bytes: JSON encoded payload
+    """
+    issue_url = f"https://api.github.com/repos/{owner}/{repo}/issues/{pr_number}"
+    labels = [{"id": 3000000 + i, "node_id": f"LA_{i}", "url": f"https://api.github.com/repos/{owner}/{repo}/labels/label-{i}",
+               "name": f"label-{i}", "color": "ededed", "default": False, "description": None} for i in range(3)]
+    payload = {
+        "action": "created",
+        "issue": {
+            "url": issue_url, "repository_url": f"https://api.github.com/repos/{owner}/{repo}", "labels_url": f"{issue_url}/labels{{/name}}",
+            "comments_url": f"{issue_url}/comments", "events_url": f"{issue_url}/events", "html_url": f"https://github.com/{owner}/{repo}/pull/{pr_number}",
+            "id": 4000004, "node_id": "PR_kwDOAAAAAA", "number": pr_number, "title": "Add a feature", "user": github_user("author"),
+            "labels": labels, "state": "open", "locked": False, "assignee": github_user("assignee"), "assignees": [github_user("assignee")],
+            "milestone": None, "comments": 5, "created_at": "2024-06-01T00:00:00Z", "updated_at": "2024-06-01T00:00:00Z", "closed_at": None,
+            "author_association": "MEMBER", "active_lock_reason": None, "draft": False,
+            "pull_request": {"url": f"https://api.github.com/repos/{owner}/{repo}/pulls/{pr_number}",
+                             "html_url": f"https://github.com/{owner}/{repo}/pull/{pr_number}",
+                             "diff_url": f"https://github.com/{owner}/{repo}/pull/{pr_number}.diff",
+                             "patch_url": f"https://github.com/{owner}/{repo}/pull/{pr_number}.patch", "merged_at": None},
+            "body": "Pull request description.\n" * 20, "reactions": {"url": f"{issue_url}/reactions", "total_count": 0},
+            "timeline_url": f"{issue_url}/timeline", "performed_via_github_app": None, "state_reason": None,
+        },
+        "comment": {
+            "url": f"https://api.github.com/repos/{owner}/{repo}/issues/comments/5000005", "html_url": f"https://github.com/{owner}/{repo}/pull/{pr_number}#issuecomment-5000005",
+            "issue_url": issue_url, "id": 5000005, "node_id": "IC_kwDOAAAAAA", "user": github_user("reviewer"),
+            "created_at": "2024-06-01T00:00:00Z", "updated_at": "2024-06-01T00:00:00Z", "author_association": "MEMBER", "body": body,
+            "reactions": {"url": "https://api.github.com/repos/comments/5000005/reactions", "total_count": 0}, "performed_via_github_app": None,
+        },
+        "repository": github_repository(owner, repo),
+        "organization": {"login": owner, "id": 6000006, "url": f"https://api.github.com/orgs/{owner}", "description": None},
+        "sender": github_user("reviewer"),
+    }
+    return json.dumps(payload).encode("utf-8")
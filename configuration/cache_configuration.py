@@ -0,0 +1,17 @@
+from dataclasses import dataclass
+from typing import Union
+
+@dataclass
+class CacheConfiguration:
+    enabled: Union[bool, str] = True
+    path: str = "data/llm_cache.db"
+    max_size_mb: Union[int, str] = 256
+    ttl_hours: Union[int, str] = 24 * 7
+
+    def __post_init__(self):
+        if isinstance(self.enabled, str):
+            self.enabled = True if self.enabled.lower() == "true" else False
+        if isinstance(self.max_size_mb, str):
+            self.max_size_mb = int(self.max_size_mb)
+        if isinstance(self.ttl_hours, str):
+            self.ttl_hours = int(self.ttl_hours)
@@ -0,0 +1,20 @@
+from dataclasses import dataclass
+from typing import Union
+
+@dataclass
+class DeliveryConfiguration:
+    enabled: Union[bool, str] = True
+    ttl_hours: Union[int, str] = 24
+    max_entries: Union[int, str] = 10000
+    persistent: Union[bool, str] = False
+    path: str = "data/deliveries.db"
+
+    def __post_init__(self):
+        if isinstance(self.enabled, str):
+            self.enabled = True if self.enabled.lower() == "true" else False
+        if isinstance(self.ttl_hours, str):
+            self.ttl_hours = int(self.ttl_hours)
+        if isinstance(self.max_entries, str):
+            self.max_entries = int(self.max_entries)
+        if isinstance(self.persistent, str):
+            self.persistent = True if self.persistent.lower() == "true" else False
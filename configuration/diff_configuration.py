@@ -0,0 +1,15 @@
+from dataclasses import dataclass
+from typing import Union
+
+@dataclass
+class DiffConfiguration:
+    spool_threshold_mb: Union[int, str] = 8
+    max_size_mb: Union[int, str] = 64
+
+    def __post_init__(self):
+        if isinstance(self.spool_threshold_mb, str):
+            self.spool_threshold_mb = int(self.spool_threshold_mb)
+        if isinstance(self.max_size_mb, str):
+            self.max_size_mb = int(self.max_size_mb)
+        if self.max_size_mb < 1:
+            raise ValueError(f"Invalid max_size_mb: {self.max_size_mb}. Must be at least 1")
@@ -0,0 +1,17 @@
+from dataclasses import dataclass
+from typing import Union
+
+@dataclass
+class HistoryConfiguration:
+    enabled: Union[bool, str] = True
+    path: str = "data/review_history.db"
+    findings_ttl_hours: Union[int, str] = 720
+    max_findings: Union[int, str] = 100000
+
+    def __post_init__(self):
+        if isinstance(self.enabled, str):
+            self.enabled = True if self.enabled.lower() == "true" else False
+        if isinstance(self.findings_ttl_hours, str):
+            self.findings_ttl_hours = int(self.findings_ttl_hours)
+        if isinstance(self.max_findings, str):
+            self.max_findings = int(self.max_findings)
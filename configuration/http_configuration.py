@@ -0,0 +1,27 @@
+from dataclasses import dataclass
+from typing import Union
+
+@dataclass
+class HttpConfiguration:
+    pool_size: Union[int, str] = 10
+    retries: Union[int, str] = 3
+    backoff_factor: Union[float, str] = 0.5
+    cache_enabled: Union[bool, str] = True
+    cache_max_entries: Union[int, str] = 1000
+    cache_max_size_mb: Union[int, str] = 32
+
+    def __post_init__(self):
+        if isinstance(self.pool_size, str):
+            self.pool_size = int(self.pool_size)
+        if self.pool_size < 1:
+            raise ValueError(f"Invalid pool_size: {self.pool_size}. Must be at least 1")
+        if isinstance(self.retries, str):
+            self.retries = int(self.retries)
+        if isinstance(self.backoff_factor, str):
+            self.backoff_factor = float(self.backoff_factor)
+        if isinstance(self.cache_enabled, str):
+            self.cache_enabled = True if self.cache_enabled.lower() == "true" else False
+        if isinstance(self.cache_max_entries, str):
+            self.cache_max_entries = int(self.cache_max_entries)
+        if isinstance(self.cache_max_size_mb, str):
+            self.cache_max_size_mb = int(self.cache_max_size_mb)
@@ -8,6 +8,11 @@ class LLMConfiguration:
     base_url: str
     model: str
     token: str
+    max_parallel_requests: Union[int, str] = 2
+    adaptive_concurrency: Union[bool, str] = True
+    latency_threshold: Union[int, str] = 180
+    context_tokens: Union[int, str] = 8192
+    response_tokens: Union[int, str] = 2048
 
     def __post_init__(self):
         if isinstance(self.type, str):
@@ -15,3 +20,15 @@ class LLMConfiguration:
                 self.type = LLMType(self.type)
             except ValueError:
                 raise ValueError(f"Invalid LLM type: {self.type}. Valid types are: {[t.value for t in LLMType]}")
+        if isinstance(self.max_parallel_requests, str):
+            self.max_parallel_requests = int(self.max_parallel_requests)
+        if self.max_parallel_requests < 1:
+            raise ValueError(f"Invalid max_parallel_requests: {self.max_parallel_requests}. Must be at least 1")
+        if isinstance(self.adaptive_concurrency, str):
+            self.adaptive_concurrency = True if self.adaptive_concurrency.lower() == "true" else False
+        if isinstance(self.latency_threshold, str):
+            self.latency_threshold = int(self.latency_threshold)
+        if isinstance(self.context_tokens, str):
+            self.context_tokens = int(self.context_tokens)
+        if isinstance(self.response_tokens, str):
+            self.response_tokens = int(self.response_tokens)
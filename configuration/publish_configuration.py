@@ -0,0 +1,21 @@
+from dataclasses import dataclass
+from typing import Union
+
+@dataclass
+class PublishConfiguration:
+    merge_comments: Union[bool, str] = True
+    max_parallel_requests: Union[int, str] = 2
+    max_attempts: Union[int, str] = 5
+    max_retry_wait: Union[int, str] = 300
+
+    def __post_init__(self):
+        if isinstance(self.merge_comments, str):
+            self.merge_comments = True if self.merge_comments.lower() == "true" else False
+        if isinstance(self.max_parallel_requests, str):
+            self.max_parallel_requests = int(self.max_parallel_requests)
+        if self.max_parallel_requests < 1:
+            raise ValueError(f"Invalid max_parallel_requests: {self.max_parallel_requests}. Must be at least 1")
+        if isinstance(self.max_attempts, str):
+            self.max_attempts = int(self.max_attempts)
+        if isinstance(self.max_retry_wait, str):
+            self.max_retry_wait = int(self.max_retry_wait)
@@ -0,0 +1,27 @@
+from dataclasses import dataclass
+from typing import Union
+from configuration.queue_type import QueueType
+
+@dataclass
+class QueueConfiguration:
+    type: Union[QueueType, str] = QueueType.Memory
+    path: str = "data/queue.db"
+    lease_timeout: Union[int, str] = 5 * 60
+    retry_delay: Union[int, str] = 60
+    max_attempts: Union[int, str] = 3
+    ack_batch_size: Union[int, str] = 10
+
+    def __post_init__(self):
+        if isinstance(self.type, str):
+            try:
+                self.type = QueueType(self.type)
+            except ValueError:
+                raise ValueError(f"Invalid queue type: {self.type}. Valid types are: {[t.value for t in QueueType]}")
+        if isinstance(self.lease_timeout, str):
+            self.lease_timeout = int(self.lease_timeout)
+        if isinstance(self.retry_delay, str):
+            self.retry_delay = int(self.retry_delay)
+        if isinstance(self.max_attempts, str):
+            self.max_attempts = int(self.max_attempts)
+        if isinstance(self.ack_batch_size, str):
+            self.ack_batch_size = int(self.ack_batch_size)
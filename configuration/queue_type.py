@@ -0,0 +1,5 @@
+from enum import Enum
+
+class QueueType(Enum):
+    Memory = "memory"
+    Sqlite = "sqlite"
\ No newline at end of file
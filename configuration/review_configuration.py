@@ -8,6 +8,7 @@ class ReviewConfiguration:
     ignore_files: Union[list[str], str]
     review_as_comments: Union[bool, str]
     review_as_conversations: Union[bool, str]
+    overlap_hunks: Union[int, str] = 0
 
 
     def __post_init__(self):
@@ -22,3 +23,5 @@ class ReviewConfiguration:
             self.review_as_comments = True if self.review_as_comments.lower() == "true" else False
         if isinstance(self.review_as_conversations, str):
             self.review_as_conversations = True if self.review_as_conversations.lower() == "true" else False
+        if isinstance(self.overlap_hunks, str):
+            self.overlap_hunks = int(self.overlap_hunks)
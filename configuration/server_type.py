@@ -0,0 +1,5 @@
+from enum import Enum
+
+class ServerType(Enum):
+    Development = "development"
+    Waitress = "waitress"
@@ -0,0 +1,11 @@
+from dataclasses import dataclass
+from typing import Union
+
+@dataclass
+class TracingConfiguration:
+    enabled: Union[bool, str] = False
+    path: str = "data/traces.json"
+
+    def __post_init__(self):
+        if isinstance(self.enabled, str):
+            self.enabled = True if self.enabled.lower() == "true" else False
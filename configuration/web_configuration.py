@@ -1,7 +1,32 @@
 from dataclasses import dataclass
+from typing import Union
+from configuration.server_type import ServerType
 
 @dataclass
 class WebConfiguration(object):
     token: str
     host: str
-    port: int
\ No newline at end of file
+    port: Union[int, str]
+    server: Union[ServerType, str] = ServerType.Waitress
+    threads: Union[int, str] = 8
+    backlog: Union[int, str] = 1024
+    connection_limit: Union[int, str] = 100
+    max_content_length_kb: Union[int, str] = 1024
+    metrics_token: str = ""
+
+    def __post_init__(self):
+        if isinstance(self.port, str):
+            self.port = int(self.port)
+        if isinstance(self.server, str):
+            try:
+                self.server = ServerType(self.server)
+            except ValueError:
+                raise ValueError(f"Invalid server type: {self.server}. Valid types are: {[t.value for t in ServerType]}")
+        if isinstance(self.threads, str):
+            self.threads = int(self.threads)
+        if isinstance(self.backlog, str):
+            self.backlog = int(self.backlog)
+        if isinstance(self.connection_limit, str):
+            self.connection_limit = int(self.connection_limit)
+        if isinstance(self.max_content_length_kb, str):
+            self.max_content_length_kb = int(self.max_content_length_kb)
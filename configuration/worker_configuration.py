@@ -0,0 +1,23 @@
+from dataclasses import dataclass
+from typing import Union
+
+@dataclass
+class WorkerConfiguration:
+    min_workers: Union[int, str] = 1
+    max_workers: Union[int, str] = 4
+    autoscale: Union[bool, str] = True
+    scale_interval: Union[int, str] = 5
+
+    def __post_init__(self):
+        if isinstance(self.min_workers, str):
+            self.min_workers = int(self.min_workers)
+        if isinstance(self.max_workers, str):
+            self.max_workers = int(self.max_workers)
+        if isinstance(self.autoscale, str):
+            self.autoscale = True if self.autoscale.lower() == "true" else False
+        if isinstance(self.scale_interval, str):
+            self.scale_interval = int(self.scale_interval)
+        if self.min_workers < 1:
+            raise ValueError(f"Invalid min_workers: {self.min_workers}. Must be at least 1")
+        if self.max_workers < self.min_workers:
+            raise ValueError(f"Invalid max_workers: {self.max_workers}. Must be greater than or equal to min_workers ({self.min_workers})")
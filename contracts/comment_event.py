@@ -0,0 +1,29 @@
+from dataclasses import dataclass
+
+def _object(value) -> dict:
+    return value if isinstance(value, dict) else {}
+
+def _string(value, default=""):
+    return value if isinstance(value, str) and value else default
+
+@dataclass
+class CommentEvent:
+    action: str
+    body: str
+    user: str
+    pull_request_url: str = None
+
+    @staticmethod
+    def create_from_github(payload: dict):
+        comment = _object(payload.get("comment"))
+        user = _object(comment.get("user"))
+        pull_request = _object(_object(payload.get("issue")).get("pull_request"))
+        return CommentEvent(_string(payload.get("action")), _string(comment.get("body")), _string(user.get("login")),
+                            _string(pull_request.get("html_url"), None))
+
+    @staticmethod
+    def create_from_gitea(payload: dict):
+        comment = _object(payload.get("comment"))
+        user = _object(comment.get("user"))
+        return CommentEvent(_string(payload.get("action")), _string(comment.get("body")), _string(user.get("email")),
+                            _string(comment.get("pull_request_url"), None))
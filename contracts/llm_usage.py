@@ -0,0 +1,31 @@
+from dataclasses import dataclass
+
+@dataclass
+class LlmUsage:
+    model: str
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    total_duration: float = 0.0 # seconds of the whole request
+    load_duration: float = None # seconds spent loading the model, None if the backend does not report it
+    prompt_duration: float = None # seconds of prompt evaluation, None if the backend does not report it
+    generation_duration: float = None # seconds of token generation, None if the backend does not report it
+
+    @property
+    def tokens_per_second(self) -> float:
+        """
+        Generation speed: completion tokens by generation time.
+
+        Returns:
+            float: Tokens per second, 0 if the backend does not report the generation time
+        """
+        return self.completion_tokens / self.generation_duration if self.generation_duration else 0.0
+
+    @property
+    def request_tokens_per_second(self) -> float:
+        """
+        Completion tokens by the time of the whole request, measured by the client (includes queueing, model load and prompt evaluation).
+
+        Returns:
+            float: Tokens per second, 0 if the duration is unknown
+        """
+        return self.completion_tokens / self.total_duration if self.total_duration else 0.0
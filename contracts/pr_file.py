@@ -0,0 +1,39 @@
+from dataclasses import dataclass
+from typing import Optional
+
+@dataclass
+class PrFile:
+    path: str
+    status: str
+    additions: int = 0
+    deletions: int = 0
+    changes: int = 0
+    previous_path: Optional[str] = None
+    patch: Optional[str] = None
+
+    @property
+    def names(self) -> list[str]:
+        """
+        All file names of the change (the current and, for renamed files, the previous path).
+
+        Returns:
+            list[str]: File names
+        """
+        return [self.path] if self.previous_path is None or self.previous_path == self.path else [self.previous_path, self.path]
+
+    def to_diff_block(self) -> str:
+        """
+        Build a git diff file block from the patch of the file.
+
+        Returns:
+            str: File block in `git diff` format
+        """
+        old_path = self.previous_path or self.path
+        block = f"diff --git a/{old_path} b/{self.path}\n"
+        if old_path != self.path:
+            block += f"rename from {old_path}\nrename to {self.path}\n"
+        if not self.patch:
+            return block
+        block += "--- /dev/null\n" if self.status == "added" else f"--- a/{old_path}\n"
+        block += "+++ /dev/null\n" if self.status in ("removed", "deleted") else f"+++ b/{self.path}\n"
+        return block + self.patch + ("" if self.patch.endswith("\n") else "\n")
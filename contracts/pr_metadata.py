@@ -0,0 +1,10 @@
+from dataclasses import dataclass
+
+@dataclass
+class PrMetadata:
+    head_sha: str
+    state: str = None
+    draft: bool = False
+    additions: int = 0
+    deletions: int = 0
+    changed_files: int = 0
@@ -0,0 +1,7 @@
+from dataclasses import dataclass, field
+
+@dataclass
+class ReviewBatch:
+    results: list
+    # Paths of files whose review failed; they are not recorded as reviewed, so the next review retries them
+    failed_paths: list[str] = field(default_factory=list)
@@ -1,7 +1,39 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+import time
+
+from contracts.pr_url import PrUrl
 
 @dataclass
 class ReviewTask:
     pull_request_url: str
     git_service: str
-    user_message: str = None
\ No newline at end of file
+    user_message: str = None
+    full_review: bool = False
+    enqueued_at: float = field(default_factory=time.time)
+    trace_id: str = None
+
+    @property
+    def coalesce_key(self) -> str:
+        """
+        Key identifying the reviewed pull request. Requests with equal keys are coalesced in queues.
+
+        Returns:
+            str: Git service and normalized pull request URL
+        """
+        try:
+            pr_url = PrUrl.create_from_url(self.pull_request_url)
+        except ValueError:
+            return f"{self.git_service}:{self.pull_request_url.lower()}"
+        return f"{self.git_service}:{pr_url.git_server_url.lower()}/{pr_url.owner.lower()}/{pr_url.repo.lower()}#{int(pr_url.pr_number)}"
+
+    def merge(self, other: "ReviewTask") -> None:
+        """
+        Merge another request for the same pull request into this task.
+
+        Args:
+            other (ReviewTask): Task with the same `coalesce_key`
+        """
+        self.full_review = self.full_review or other.full_review
+        if not other.user_message or (self.user_message and other.user_message in self.user_message):
+            return
+        self.user_message = f"{self.user_message}\n{other.user_message}" if self.user_message else other.user_message
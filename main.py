@@ -4,20 +4,41 @@ from simple_di_container import Container
 
 from api import Api
 from configuration.github_configuration import GithubConfiguration
+from services.comment_publisher import CommentPublisher
+from services.delivery_tracker import DeliveryTracker
 from services.gitea_service import GiteaService
 from services.ai.olama_ai_client import OllamaAIClient
 from services.ai.ai_client import AIClient
+from services.ai.adaptive_concurrency_ai_client import AdaptiveConcurrencyAIClient
+from services.ai.cached_ai_client import CachedAIClient
+from services.ai.usage_tracker import UsageTracker
 from services.ai.openai_compatible_ai_client import OpenAICompatibleAIClient
 from services.github_service import GithubService
+from services.http_session_pool import HttpSessionPool
+from services.metrics_service import MetricsService
 from services.queue.memory_task_queue import InMemoryTaskQueue
+from services.queue.sqlite_task_queue import SqliteTaskQueue
+from services.queue.task_queue import TaskQueue
+from services.review_history_service import ReviewHistoryService
 from services.review_service import ReviewService
+from services.tracing_service import TracingService
 
 from configuration.web_configuration import WebConfiguration
 from configuration.gitea_configuration import GiteaConfiguration
 from configuration.llm_configuration import LLMConfiguration
+from configuration.cache_configuration import CacheConfiguration
+from configuration.delivery_configuration import DeliveryConfiguration
+from configuration.diff_configuration import DiffConfiguration
+from configuration.http_configuration import HttpConfiguration
+from configuration.history_configuration import HistoryConfiguration
+from configuration.publish_configuration import PublishConfiguration
 from configuration.review_configuration import ReviewConfiguration
+from configuration.tracing_configuration import TracingConfiguration
 from configuration.llm_type import LLMType
-from worker import Worker
+from configuration.queue_configuration import QueueConfiguration
+from configuration.queue_type import QueueType
+from configuration.worker_configuration import WorkerConfiguration
+from worker_pool import WorkerPool
 
 #Initialize Container
 container = Container()
@@ -38,24 +59,75 @@ container.register(GiteaConfiguration, instance=GiteaConfiguration(**configurati
 container.register(GithubConfiguration, instance=GithubConfiguration(**configuration["github"]))
 container.register(LLMConfiguration, instance=LLMConfiguration(**configuration["llm"]))
 container.register(ReviewConfiguration, instance=ReviewConfiguration(**configuration["review"]))
+container.register(WorkerConfiguration, instance=WorkerConfiguration(**configuration["worker"]))
+container.register(QueueConfiguration, instance=QueueConfiguration(**configuration["queue"]))
+container.register(CacheConfiguration, instance=CacheConfiguration(**configuration["cache"]))
+container.register(HistoryConfiguration, instance=HistoryConfiguration(**configuration["history"]))
+container.register(DiffConfiguration, instance=DiffConfiguration(**configuration["diff"]))
+container.register(HttpConfiguration, instance=HttpConfiguration(**configuration["http"]))
+container.register(PublishConfiguration, instance=PublishConfiguration(**configuration["publish"]))
+container.register(DeliveryConfiguration, instance=DeliveryConfiguration(**configuration["delivery"]))
+container.register(TracingConfiguration, instance=TracingConfiguration(**configuration["tracing"]))
 
 def llm_client_factory(services: Container) -> AIClient:
     llm_configuration : LLMConfiguration = services.resolve(LLMConfiguration)
+    metrics : MetricsService = services.resolve(MetricsService)
+    usage_tracker : UsageTracker = services.resolve(UsageTracker)
+    metrics.add_stats_collector("llm_usage", usage_tracker.stats, label=("model", "repository"),
+                                counters=("requests", "prompt_tokens", "completion_tokens", "request_seconds", "load_seconds",
+                                          "prompt_seconds", "generation_seconds", "cold_loads"))
     if (llm_configuration.type == LLMType.Ollama):
-        return OllamaAIClient(llm_configuration)
-    return OpenAICompatibleAIClient(llm_configuration)
+        ai_client = OllamaAIClient(llm_configuration, services.resolve(HttpSessionPool), usage_tracker)
+    else:
+        ai_client = OpenAICompatibleAIClient(llm_configuration, metrics, usage_tracker)
+    if llm_configuration.adaptive_concurrency:
+        ai_client = AdaptiveConcurrencyAIClient(ai_client, llm_configuration.max_parallel_requests, llm_configuration.latency_threshold)
+        metrics.add_stats_collector("llm_limiter", ai_client.stats, counters=("overloads",))
+    cache_configuration : CacheConfiguration = services.resolve(CacheConfiguration)
+    if cache_configuration.enabled:
+        ai_client = CachedAIClient(ai_client, cache_configuration, {"type": llm_configuration.type.value, "base_url": llm_configuration.base_url})
+        metrics.add_stats_collector("llm_cache", ai_client.stats, counters=("hits", "misses"))
+    return ai_client
 
+def task_queue_factory(services: Container) -> TaskQueue:
+    queue_configuration : QueueConfiguration = services.resolve(QueueConfiguration)
+    if (queue_configuration.type == QueueType.Sqlite):
+        return SqliteTaskQueue(queue_configuration)
+    return InMemoryTaskQueue()
+
+def configure_metrics(services: Container) -> None:
+    metrics : MetricsService = services.resolve(MetricsService)
+    queue : TaskQueue = services.resolve(TaskQueue)
+    worker_pool : WorkerPool = services.resolve(WorkerPool)
+    metrics.add_collector(lambda: [("queue_depth", "gauge", None, queue.size()),
+                                   ("workers", "gauge", None, worker_pool.size),
+                                   ("workers_busy", "gauge", None, worker_pool.busy)])
+    http : HttpSessionPool = services.resolve(HttpSessionPool)
+    metrics.add_stats_collector("http", http.stats, counters=("requests", "retries", "connections", "reused"), label="host")
+    if http.cache is not None:
+        metrics.add_stats_collector("http_cache", http.cache.stats, counters=("hits", "misses"))
+    delivery_tracker : DeliveryTracker = services.resolve(DeliveryTracker)
+    metrics.add_stats_collector("delivery", delivery_tracker.stats, counters=("hits",))
+
+container.register(MetricsService)
+container.register(UsageTracker)
+container.register(TracingService)
+container.register(HttpSessionPool)
 container.register(AIClient, factory=llm_client_factory)
 container.register(GiteaService)
 container.register(GithubService)
 container.register(ReviewService)
-container.register(InMemoryTaskQueue)
+container.register(ReviewHistoryService)
+container.register(CommentPublisher)
+container.register(DeliveryTracker)
+container.register(TaskQueue, factory=task_queue_factory)
 container.register(Api)
-container.register(Worker)
+container.register(WorkerPool)
 
 
 if __name__ == "__main__":
-    worker : Worker = container.resolve(Worker)
-    worker.start()
+    configure_metrics(container)
+    worker_pool : WorkerPool = container.resolve(WorkerPool)
+    worker_pool.start()
     api : Api = container.resolve(Api)
     api.start()
\ No newline at end of file
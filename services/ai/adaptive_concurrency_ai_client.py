@@ -0,0 +1,167 @@
+import logging
+import threading
+import time
+
+import httpx
+import requests
+from openai import APITimeoutError
+
+from services.ai.ai_client import AIClient
+
+class AdaptiveConcurrencyAIClient(AIClient):
+    """
+    AI client wrapper limiting the number of in-flight requests to the wrapped client.
+
+    The limit is adjusted with AIMD (additive increase, multiplicative decrease):
+    every successful request answered faster than `latency_threshold` increases the limit
+    by `1 / limit`, while a timeout, a rate limit / overload response (429, 502, 503, 504)
+    or a slow answer multiplies it by `backoff_ratio`. Requests above the limit wait for a free slot.
+
+    Attributes:
+        ai_client (AIClient): The wrapped AI client
+        min_limit (int): Lowest allowed concurrency limit
+        max_limit (int): Highest allowed concurrency limit
+        latency_threshold (float): Latency (seconds) above which the backend is treated as overloaded
+        backoff_ratio (float): Factor applied to the limit on overload
+        logger (logging.Logger): Logger instance for limiter operations
+    """
+    OVERLOAD_STATUS_CODES: tuple = (429, 502, 503, 504)
+    QUEUEING_DELAY_SMOOTHING: float = 0.2
+
+    def __init__(self, ai_client: AIClient, max_limit: int, latency_threshold: float, min_limit: int = 1, backoff_ratio: float = 0.5):
+        """
+        Initialize the limiter. The limit starts at `max_limit` and shrinks when the backend struggles.
+
+        Args:
+            ai_client (AIClient): The AI client to wrap
+            max_limit (int): Highest allowed concurrency limit
+            latency_threshold (float): Latency (seconds) above which the backend is treated as overloaded
+            min_limit (int, optional): Lowest allowed concurrency limit
+            backoff_ratio (float, optional): Factor applied to the limit on overload
+        """
+        self.ai_client = ai_client
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_threshold = latency_threshold
+        self.backoff_ratio = backoff_ratio
+        self.logger = logging.getLogger(AdaptiveConcurrencyAIClient.__name__)
+        self._condition = threading.Condition()
+        self._limit = float(max_limit)
+        self._in_flight = 0
+        self._waiting = 0
+        self._queueing_delay = 0.0
+        self._last_decrease = 0.0
+        self._overloads = 0
+
+    @property
+    def limit(self) -> int:
+        """Returns the current concurrency limit.
+
+        Returns:
+            int: Maximal count of in-flight requests
+        """
+        return int(self._limit)
+
+    @property
+    def queueing_delay(self) -> float:
+        """Returns the smoothed time requests wait for a free slot.
+
+        Returns:
+            float: Queueing delay in seconds
+        """
+        return self._queueing_delay
+
+    def stats(self) -> dict:
+        """
+        Get a snapshot of the limiter state.
+
+        Returns:
+            dict: Current limit, in-flight and waiting requests, queueing delay and overload count
+        """
+        with self._condition:
+            return {
+                "limit": int(self._limit),
+                "in_flight": self._in_flight,
+                "waiting": self._waiting,
+                "queueing_delay": self._queueing_delay,
+                "overloads": self._overloads,
+            }
+
+    def completions(self, messages: list[dict], model: str) -> str:
+        """
+        Get completions from the wrapped client once a concurrency slot is free.
+
+        Args:
+            messages (list[dict]): List of message dictionaries containing role and content
+            model (str): The model to use for completion
+
+        Returns:
+            str: The generated completion text
+        """
+        started = self.__acquire()
+        try:
+            result = self.ai_client.completions(messages, model)
+        except Exception as e:
+            self.__release(started, overloaded=self.__is_overload(e))
+            raise
+        self.__release(started, overloaded=time.monotonic() - started > self.latency_threshold)
+        return result
+
+    def __acquire(self) -> float:
+        """
+        Wait for a free slot and occupy it.
+
+        Returns:
+            float: Monotonic time the request was started
+        """
+        enqueued = time.monotonic()
+        with self._condition:
+            self._waiting += 1
+            self._condition.wait_for(lambda: self._in_flight < int(self._limit))
+            self._waiting -= 1
+            self._in_flight += 1
+            started = time.monotonic()
+            self._queueing_delay += self.QUEUEING_DELAY_SMOOTHING * ((started - enqueued) - self._queueing_delay)
+            return started
+
+    def __release(self, started: float, overloaded: bool) -> None:
+        """
+        Free the slot and adjust the limit by the outcome of the request.
+
+        Args:
+            started (float): Monotonic time the request was started
+            overloaded (bool): Whether the request signals an overloaded backend
+        """
+        with self._condition:
+            self._in_flight -= 1
+            previous = int(self._limit)
+            if overloaded:
+                self._overloads += 1
+                # Requests started before the previous decrease reflect the old limit; decrease once per generation
+                if started >= self._last_decrease:
+                    self._limit = max(float(self.min_limit), self._limit * self.backoff_ratio)
+                    self._last_decrease = time.monotonic()
+            else:
+                self._limit = min(float(self.max_limit), self._limit + 1 / self._limit)
+            if int(self._limit) != previous:
+                self.logger.info("LLM concurrency limit changed %s -> %s (in flight=%s, waiting=%s, queueing delay=%.1fs)",
+                                 previous, int(self._limit), self._in_flight, self._waiting, self._queueing_delay)
+            self._condition.notify_all()
+
+    @classmethod
+    def __is_overload(cls, error: Exception) -> bool:
+        """
+        Check whether an error means the backend is overloaded.
+
+        Args:
+            error (Exception): Error raised by the wrapped client
+
+        Returns:
+            bool: True for timeouts and overload status codes
+        """
+        if isinstance(error, (TimeoutError, requests.exceptions.Timeout, httpx.TimeoutException, APITimeoutError)):
+            return True
+        status_code = getattr(error, "status_code", None)
+        if status_code is None and getattr(error, "response", None) is not None:
+            status_code = getattr(error.response, "status_code", None)
+        return status_code in cls.OVERLOAD_STATUS_CODES
@@ -0,0 +1,169 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from configuration.cache_configuration import CacheConfiguration
+from services.ai.ai_client import AIClient
+
+class CachedAIClient(AIClient):
+    """
+    AI client wrapper caching completions in a local SQLite database.
+
+    Completions are addressed by a SHA-256 hash of the model, the messages and the
+    client options (backend type and url), so an identical prompt is answered from disk.
+    Entries expire after `ttl_hours`, and the least recently used entries are evicted
+    when the cache grows above `max_size_mb`. Concurrent requests for the same key
+    wait for the first one instead of calling the model again.
+
+    Attributes:
+        ai_client (AIClient): The wrapped AI client
+        configuration (CacheConfiguration): Cache settings
+        options (dict): Client options which are part of the cache key
+        logger (logging.Logger): Logger instance for cache operations
+    """
+    EVICTION_TARGET: float = 0.9
+
+    def __init__(self, ai_client: AIClient, configuration: CacheConfiguration, options: dict = None):
+        """
+        Open (or create) the cache database and drop expired entries.
+
+        Args:
+            ai_client (AIClient): The AI client to wrap
+            configuration (CacheConfiguration): Cache settings
+            options (dict, optional): Client options which are part of the cache key
+        """
+        self.ai_client = ai_client
+        self.configuration = configuration
+        self.options = options or {}
+        self.logger = logging.getLogger(CachedAIClient.__name__)
+        self._lock = threading.Lock()
+        self._in_flight: dict[str, threading.Event] = {}
+        self._hits = 0
+        self._misses = 0
+        self._ttl = configuration.ttl_hours * 60 * 60
+        self._max_size = configuration.max_size_mb * 1024 * 1024
+        directory = os.path.dirname(configuration.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(configuration.path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS completions (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )""")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS completions_accessed_at ON completions (accessed_at)")
+        self._connection.execute("DELETE FROM completions WHERE created_at < ?", (time.time() - self._ttl,))
+        self._size = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM completions").fetchone()[0]
+
+    def stats(self) -> dict:
+        """
+        Get cache statistics.
+
+        Returns:
+            dict: Hits, misses, hit ratio, entries count and stored size in bytes
+        """
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": self._hits / total if total > 0 else 0.0,
+                "entries": self._connection.execute("SELECT COUNT(*) FROM completions").fetchone()[0],
+                "size_bytes": self._size,
+            }
+
+    def completions(self, messages: list[dict], model: str) -> str:
+        """
+        Get completions from the cache, or from the wrapped client on a miss.
+
+        Args:
+            messages (list[dict]): List of message dictionaries containing role and content
+            model (str): The model to use for completion
+
+        Returns:
+            str: The generated completion text
+        """
+        key = self.__key(messages, model)
+        while True:
+            with self._lock:
+                value = self.__get(key)
+                if value is not None:
+                    self._hits += 1
+                    return value
+                waiter = self._in_flight.get(key)
+                if waiter is None:
+                    self._misses += 1
+                    self._in_flight[key] = threading.Event()
+                    break
+            # The same prompt is being completed by another thread, reuse its answer
+            waiter.wait()
+        try:
+            value = self.ai_client.completions(messages, model)
+            if value is not None:
+                with self._lock:
+                    self.__put(key, value)
+            return value
+        finally:
+            with self._lock:
+                self._in_flight.pop(key).set()
+
+    def __key(self, messages: list[dict], model: str) -> str:
+        """
+        Build the content address of a completion request.
+
+        Returns:
+            str: SHA-256 hex digest of the model, messages and options
+        """
+        payload = json.dumps({"model": model, "messages": messages, "options": self.options}, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def __get(self, key: str) -> str:
+        """
+        Read an entry and refresh its access time. Must be called under the cache lock.
+
+        Returns:
+            str: Cached completion, or None if missing or expired
+        """
+        row = self._connection.execute("SELECT value, size, created_at FROM completions WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        value, size, created_at = row
+        now = time.time()
+        if created_at < now - self._ttl:
+            self._connection.execute("DELETE FROM completions WHERE key = ?", (key,))
+            self._size -= size
+            return None
+        self._connection.execute("UPDATE completions SET accessed_at = ? WHERE key = ?", (now, key))
+        return value
+
+    def __put(self, key: str, value: str) -> None:
+        """
+        Store an entry and evict least recently used entries above the size limit. Must be called under the cache lock.
+        """
+        size = len(value.encode("utf-8"))
+        now = time.time()
+        previous = self._connection.execute("SELECT size FROM completions WHERE key = ?", (key,)).fetchone()
+        self._connection.execute("INSERT OR REPLACE INTO completions (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                                 (key, value, size, now, now))
+        self._size += size - (previous[0] if previous else 0)
+        if self._size <= self._max_size:
+            return
+        # Evict down to 90% of the limit, so the next puts don't trigger eviction again
+        target_size = self._max_size * self.EVICTION_TARGET
+        evicted = 0
+        for evicted_key, evicted_size in self._connection.execute("SELECT key, size FROM completions ORDER BY accessed_at").fetchall():
+            if self._size <= target_size:
+                break
+            self._connection.execute("DELETE FROM completions WHERE key = ?", (evicted_key,))
+            self._size -= evicted_size
+            evicted += 1
+        self.logger.debug("Evicted %s completions from cache", evicted)
@@ -1,7 +1,10 @@
-import requests
 from dataclasses import dataclass
 
+from contracts.llm_usage import LlmUsage
+
 from services.ai.ai_client import AIClient
+from services.ai.usage_tracker import UsageTracker
+from services.http_session_pool import HttpSessionPool
 from configuration.llm_configuration import LLMConfiguration
 
 
@@ -16,12 +19,12 @@ class Response:
         message (dict): The response message content
         done (bool): Whether the response is complete
         done_reason (str): Reason for completion
-        total_duration (int): Total duration of the request
-        load_duration (int): Duration of model loading
-        prompt_eval_count (int): Number of prompt evaluations
-        prompt_eval_duration (int): Duration of prompt evaluation
-        eval_count (int): Number of evaluations
-        eval_duration (int): Duration of evaluations
+        total_duration (int): Total duration of the request (nanoseconds)
+        load_duration (int): Duration of model loading (nanoseconds)
+        prompt_eval_count (int): Number of prompt tokens
+        prompt_eval_duration (int): Duration of prompt evaluation (nanoseconds)
+        eval_count (int): Number of generated tokens
+        eval_duration (int): Duration of generation (nanoseconds)
     """
     model: str
     created_at: str
@@ -35,6 +38,16 @@ class Response:
     eval_count: int
     eval_duration: int
 
+    def to_usage(self) -> LlmUsage:
+        """
+        Convert the counters of the response to usage of the request.
+
+        Returns:
+            LlmUsage: Token counts and durations in seconds
+        """
+        return LlmUsage(self.model, self.prompt_eval_count or 0, self.eval_count or 0, (self.total_duration or 0) / 1e9,
+                        (self.load_duration or 0) / 1e9, (self.prompt_eval_duration or 0) / 1e9, (self.eval_duration or 0) / 1e9)
+
 @dataclass
 class OllamaClientConfiguration:
     """
@@ -60,15 +73,21 @@ class OllamaAIClient(AIClient):
     
     Attributes:
         configuration (LLMConfiguration): Configuration for the LLM client
+        http (HttpSessionPool): Pooled keep-alive sessions used for API calls
+        usage_tracker (UsageTracker): Collector of token usage and timings, optional
     """
-    def __init__(self, configuration: LLMConfiguration):
+    def __init__(self, configuration: LLMConfiguration, http: HttpSessionPool, usage_tracker: UsageTracker = None):
         """
         Initialize the OllamaAIClient with the given configuration.
         
         Args:
             configuration (LLMConfiguration): Configuration containing API base URL and other settings
+            http (HttpSessionPool): Pooled keep-alive sessions used for API calls
+            usage_tracker (UsageTracker, optional): Collector of token usage and timings
         """
         self.configuration = configuration
+        self.http = http
+        self.usage_tracker = usage_tracker
 
     def completions(self, messages: list[dict], model : str) -> str:
         """
@@ -84,11 +103,17 @@ class OllamaAIClient(AIClient):
         request_data = {
             "model": model,
             "messages": messages,
-            "stream": False
+            "stream": False,
+            "options": {
+                "num_ctx": self.configuration.context_tokens, # diff chunks are sized to this context window
+                "num_predict": self.configuration.response_tokens # the answer must fit the space reserved for it
+            }
         }
-        response = requests.post(f"{self.configuration.base_url}/api/chat", json=request_data, timeout=60 * 10)
+        response = self.http.post(f"{self.configuration.base_url}/api/chat", json=request_data, timeout=60 * 10)
         response.raise_for_status()
         response_object = Response(**response.json())
         if not response_object.done:
             return None
+        if self.usage_tracker is not None:
+            self.usage_tracker.record(response_object.to_usage())
         return response_object.message.get("content")
@@ -6,6 +6,9 @@ from openai import OpenAI, APITimeoutError
 
 from services.ai.ai_client import AIClient
 from configuration.llm_configuration import LLMConfiguration
+from contracts.llm_usage import LlmUsage
+from services.ai.usage_tracker import UsageTracker
+from services.metrics_service import MetricsService
 
 class OpenAICompatibleAIClient(AIClient):
     """
@@ -17,15 +20,21 @@ class OpenAICompatibleAIClient(AIClient):
     Attributes:
         configuration (LLMConfiguration): Configuration for the LLM client
         client (OpenAI): The OpenAI client instance
+        metrics (MetricsService): Collector of retried requests, optional
+        usage_tracker (UsageTracker): Collector of token usage and timings, optional
     """
-    def __init__(self, configuration: LLMConfiguration):
+    def __init__(self, configuration: LLMConfiguration, metrics: MetricsService = None, usage_tracker: UsageTracker = None):
         """
         Initialize the OpenAICompatibleAIClient with the given configuration.
         
         Args:
             configuration (LLMConfiguration): Configuration containing API token and base URL
+            metrics (MetricsService, optional): Collector of retried requests
+            usage_tracker (UsageTracker, optional): Collector of token usage and timings
         """
         self.configuration = configuration
+        self.metrics = metrics
+        self.usage_tracker = usage_tracker
         self.logger = logging.getLogger(OpenAICompatibleAIClient.__name__)
         self.client = OpenAI(
             api_key=configuration.token,
@@ -48,12 +57,17 @@ class OpenAICompatibleAIClient(AIClient):
         
         for attempt in range(max_retries):
             try:
+                started = time.monotonic()
                 response = self.client.chat.completions.create(
                     messages=messages,
                     model=model,
-                    max_tokens=50000,
+                    max_tokens=self.configuration.response_tokens,
                     timeout=httpx.Timeout(60 * 5)
                 )
+                # The API reports token counts only, timings are measured around the request
+                if self.usage_tracker is not None and response.usage is not None:
+                    self.usage_tracker.record(LlmUsage(response.model or model, response.usage.prompt_tokens or 0,
+                                                       response.usage.completion_tokens or 0, time.monotonic() - started))
                 if len(response.choices) == 0:
                     return None
                 return response.choices[0].message.content
@@ -61,5 +75,7 @@ class OpenAICompatibleAIClient(AIClient):
                 if attempt == max_retries - 1:
                     raise
                 self.logger.warning("%s. Retrying request in %s seconds", e.__class__.__name__, retry_delay)
+                if self.metrics is not None:
+                    self.metrics.inc("retries", {"component": self.configuration.type.value, "operation": "llm"})
                 time.sleep(retry_delay)
                 retry_delay *= 2
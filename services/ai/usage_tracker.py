@@ -0,0 +1,90 @@
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from contracts.llm_usage import LlmUsage
+
+class UsageTracker:
+    """
+    Aggregates token usage and timings reported by language model backends, by model and repository.
+
+    Backend clients report the usage of every completed request with `record`. The repository of the
+    review is taken from a context variable set by the worker (`repository`); threads sending prompts
+    must run in a copy of the worker context (see `contextvars.copy_context`). Answers served from
+    the completion cache are not reported, they cost no tokens.
+
+    Attributes:
+        logger (logging.Logger): Logger instance for usage reports
+    """
+    COLD_LOAD_THRESHOLD: float = 0.5 # A request spending longer loading the model found it unloaded
+    UNKNOWN_REPOSITORY: str = "unknown"
+    _repository: ContextVar[str] = ContextVar("repository", default=UNKNOWN_REPOSITORY)
+
+    def __init__(self):
+        """
+        Initialize empty usage totals.
+        """
+        self.logger = logging.getLogger(UsageTracker.__name__)
+        self._lock = threading.Lock()
+        self._totals: dict[tuple[str, str], dict] = {}
+
+    @classmethod
+    @contextmanager
+    def repository(cls, name: str):
+        """
+        Attribute usage reported in the current context to a repository.
+
+        Args:
+            name (str): Repository name (`owner/repo`)
+        """
+        token = cls._repository.set(name)
+        try:
+            yield
+        finally:
+            cls._repository.reset(token)
+
+    def record(self, usage: LlmUsage) -> None:
+        """
+        Add the usage of one request to the totals of its model and the current repository.
+
+        Args:
+            usage (LlmUsage): Usage reported by the backend
+        """
+        repository = self._repository.get()
+        cold_load = usage.load_duration is not None and usage.load_duration > self.COLD_LOAD_THRESHOLD
+        speed = f"{usage.tokens_per_second:.1f} tokens/s" if usage.generation_duration else f"{usage.request_tokens_per_second:.1f} tokens/s by request time"
+        self.logger.info("LLM usage (%s, %s): %s prompt + %s completion tokens in %.1fs (%s%s)", usage.model, repository,
+                         usage.prompt_tokens, usage.completion_tokens, usage.total_duration, speed,
+                         f", model loaded in {usage.load_duration:.1f}s" if cold_load else "")
+        with self._lock:
+            totals = self._totals.get((usage.model, repository))
+            if totals is None:
+                totals = self._totals[(usage.model, repository)] = {
+                    "requests": 0, "prompt_tokens": 0, "completion_tokens": 0, "request_seconds": 0.0,
+                    "load_seconds": 0.0, "prompt_seconds": 0.0, "generation_seconds": 0.0, "cold_loads": 0,
+                }
+            totals["requests"] += 1
+            totals["prompt_tokens"] += usage.prompt_tokens
+            totals["completion_tokens"] += usage.completion_tokens
+            totals["request_seconds"] += usage.total_duration
+            totals["load_seconds"] += usage.load_duration or 0.0
+            totals["prompt_seconds"] += usage.prompt_duration or 0.0
+            totals["generation_seconds"] += usage.generation_duration or 0.0
+            totals["cold_loads"] += 1 if cold_load else 0
+
+    def stats(self) -> dict:
+        """
+        Get usage totals.
+
+        Returns:
+            dict: Totals by `(model, repository)`: requests, prompt and completion tokens, request, model load,
+                prompt evaluation and generation seconds, cold model loads, average generation speed (tokens/s,
+                0 if the backend does not report timings) and average speed by request time (tokens/s)
+        """
+        with self._lock:
+            stats = {key: dict(totals) for key, totals in self._totals.items()}
+        for totals in stats.values():
+            totals["tokens_per_second"] = totals["completion_tokens"] / totals["generation_seconds"] if totals["generation_seconds"] else 0.0
+            totals["request_tokens_per_second"] = totals["completion_tokens"] / totals["request_seconds"] if totals["request_seconds"] else 0.0
+        return stats
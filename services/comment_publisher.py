@@ -0,0 +1,194 @@
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
+from datetime import datetime, timezone
+import logging
+import time
+import uuid
+
+import requests
+
+from configuration.publish_configuration import PublishConfiguration
+from contracts.pr_url import PrUrl
+from services.git_service import GitService
+from services.metrics_service import MetricsService
+from services.tracing_service import TracingService
+
+class CommentPublisher:
+    """
+    Publishing stage of review comments.
+
+    Review results of diff chunks are merged into as few comments as the comment size limit
+    of the git service allows, and posted with bounded parallelism. Rate limit answers (429, or 403
+    of GitHub secondary rate limits) are retried after `Retry-After` / `X-RateLimit-Reset`.
+    Every comment carries a hidden marker, so after a timeout the comments of the pull request
+    are checked for the marker before posting again, and an ambiguous failure never creates a duplicate.
+    Markers of a publication with a stable id are also checked before the first attempt, so a retried
+    review does not post its comments twice.
+
+    Attributes:
+        configuration (PublishConfiguration): Publishing settings
+        executor (ThreadPoolExecutor): Executor bounding parallel comment requests
+        metrics (MetricsService): Collector of retried comment requests
+        tracing (TracingService): Writer of spans of comment requests
+        logger (logging.Logger): Logger instance for publishing operations
+    """
+    SEPARATOR: str = "\n\n---\n\n"
+    MARKER: str = "\n\n<!-- ai-reviewer:{} -->"
+    TRUNCATED: str = "\n\n…"
+    RETRY_DELAY: int = 60 # GitHub asks to wait at least one minute after a secondary rate limit without Retry-After
+
+    def __init__(self, configuration: PublishConfiguration, metrics: MetricsService, tracing: TracingService):
+        """
+        Initialize the publisher.
+
+        Args:
+            configuration (PublishConfiguration): Publishing settings
+            metrics (MetricsService): Collector of retried comment requests
+            tracing (TracingService): Writer of review traces
+        """
+        self.configuration = configuration
+        self.metrics = metrics
+        self.tracing = tracing
+        self.executor = ThreadPoolExecutor(max_workers=configuration.max_parallel_requests, thread_name_prefix="Publish")
+        self.logger = logging.getLogger(CommentPublisher.__name__)
+
+    def publish(self, service: GitService, pr_url: PrUrl, comments: list[str], publication_id: str = None, since: datetime = None) -> None:
+        """
+        Merge and post comments to a pull request.
+
+        With a `publication_id` the markers are stable: when the same publication is repeated
+        (e.g. a released task is redelivered), comments posted by the previous attempt are found
+        by their markers and not posted again.
+
+        Args:
+            service (GitService): The Git service of the pull request
+            pr_url (PrUrl): The pull request URL object containing repository and PR information
+            comments (list[str]): Comment texts in order
+            publication_id (str, optional): Identifier of the publication, the same on every attempt (random by default)
+            since (datetime, optional): Time before which no comment of the publication was posted (limits the comments checked)
+
+        Raises:
+            Exception: The first error, if some comment could not be posted
+        """
+        run_id = publication_id or uuid.uuid4().hex[:12]
+        limit = service.MAX_COMMENT_LENGTH - len(self.MARKER.format(f"{run_id}:000"))
+        bodies = self.__merge(comments, limit) if self.configuration.merge_comments else [self.__truncate(c, limit) for c in comments]
+        if len(bodies) < len(comments):
+            self.logger.info("Merged %s review comments into %s", len(comments), len(bodies))
+        bodies = [body + self.MARKER.format(f"{run_id}:{index:03}") for index, body in enumerate(bodies)]
+        if publication_id is not None and bodies:
+            posted = self.__get_comments(service, pr_url, since)
+            new_bodies = [body for body in bodies if not any(body[body.rindex("<!--"):] in comment for comment in posted)]
+            if len(new_bodies) < len(bodies):
+                self.logger.info("%s of %s comments were posted by a previous attempt. Not posting them again", len(bodies) - len(new_bodies), len(bodies))
+            bodies = new_bodies
+        # Comments are posted in a copy of the caller context, so their spans belong to the review trace
+        futures = [self.executor.submit(contextvars.copy_context().run, self.__post, service, pr_url, body) for body in bodies]
+        errors = []
+        for future in futures:
+            try:
+                future.result()
+            except Exception as e:
+                errors.append(e)
+        if len(errors) > 0:
+            raise errors[0]
+
+    def __merge(self, comments: list[str], limit: int) -> list[str]:
+        """
+        Join consecutive comments while the result fits into the size limit.
+
+        Args:
+            comments (list[str]): Comment texts in order
+            limit (int): Maximal length of a comment
+
+        Returns:
+            list[str]: Merged comments
+        """
+        bodies = []
+        for comment in comments:
+            comment = self.__truncate(comment, limit)
+            if bodies and len(bodies[-1]) + len(self.SEPARATOR) + len(comment) <= limit:
+                bodies[-1] += self.SEPARATOR + comment
+            else:
+                bodies.append(comment)
+        return bodies
+
+    def __truncate(self, comment: str, limit: int) -> str:
+        """
+        Cut a comment longer than the size limit.
+        """
+        return comment if len(comment) <= limit else comment[:limit - len(self.TRUNCATED)] + self.TRUNCATED
+
+    def __post(self, service: GitService, pr_url: PrUrl, body: str) -> None:
+        """
+        Post one comment, retrying rate limited and failed requests.
+
+        Args:
+            service (GitService): The Git service of the pull request
+            pr_url (PrUrl): The pull request URL object containing repository and PR information
+            body (str): Comment text with the hidden marker
+        """
+        marker = body[body.rindex("<!--"):]
+        started = datetime.now(timezone.utc)
+        for attempt in range(1, self.configuration.max_attempts + 1):
+            try:
+                with self.tracing.span("post_comment", "git", attempt=attempt, size=len(body)):
+                    service.post_comment(pr_url, body)
+                return
+            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+                # The comment may have been created before the connection failed
+                if attempt == self.configuration.max_attempts:
+                    raise
+                delay = min(2 ** attempt, self.configuration.max_retry_wait)
+                self.logger.warning("%s while posting comment (attempt %s). Retrying in %s seconds", e.__class__.__name__, attempt, delay)
+                self.metrics.inc("retries", {"component": service.NAME, "operation": "publish"})
+                time.sleep(delay)
+                if self.__is_posted(service, pr_url, marker, started):
+                    self.logger.info("Comment %s was created before the failure. Not posting again", marker)
+                    return
+            except requests.HTTPError as e:
+                delay = self.__rate_limit_delay(e.response)
+                if delay is None or attempt == self.configuration.max_attempts:
+                    raise
+                self.logger.warning("Rate limited while posting comment (attempt %s). Retrying in %s seconds", attempt, delay)
+                self.metrics.inc("retries", {"component": service.NAME, "operation": "publish"})
+                time.sleep(delay)
+
+    def __is_posted(self, service: GitService, pr_url: PrUrl, marker: str, since: datetime) -> bool:
+        """
+        Check whether a comment with the marker exists.
+        """
+        return any(marker in comment for comment in self.__get_comments(service, pr_url, since))
+
+    def __get_comments(self, service: GitService, pr_url: PrUrl, since: datetime) -> list[str]:
+        """
+        Get the comments of a pull request, or no comments if they can't be read.
+        """
+        try:
+            with self.tracing.span("get_comments", "git"):
+                return service.get_comments(pr_url, since)
+        except Exception as e:
+            self.logger.warning("Error checking posted comments: %s", e)
+            return []
+
+    def __rate_limit_delay(self, response: requests.Response) -> float:
+        """
+        Get the delay requested by a rate limit answer.
+
+        Args:
+            response (requests.Response): Failed response
+
+        Returns:
+            float: Seconds to wait before the next attempt, or None if the answer is not a rate limit
+        """
+        if response is None or response.status_code not in (403, 429):
+            return None
+        retry_after = response.headers.get("Retry-After")
+        if retry_after is not None and retry_after.isdigit():
+            return min(int(retry_after), self.configuration.max_retry_wait)
+        reset = response.headers.get("X-RateLimit-Reset")
+        if response.headers.get("X-RateLimit-Remaining") == "0" and reset is not None and reset.isdigit():
+            return min(max(int(reset) - time.time(), 1), self.configuration.max_retry_wait)
+        if response.status_code == 429 or "rate limit" in response.text.lower():
+            return min(self.RETRY_DELAY, self.configuration.max_retry_wait)
+        return None
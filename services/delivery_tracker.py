@@ -0,0 +1,115 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from configuration.delivery_configuration import DeliveryConfiguration
+
+class DeliveryTracker:
+    """
+    Bounded set of seen webhook delivery ids (`X-GitHub-Delivery` / `X-Gitea-Delivery`).
+
+    Git services redeliver a webhook when the answer is late, with the same delivery id.
+    A delivery id is kept for `ttl_hours` (the oldest ids are evicted above `max_entries`),
+    so a redelivered review command is answered without enqueueing a second review.
+    With `persistent` enabled the ids are also stored in a SQLite database and survive restarts.
+
+    Attributes:
+        configuration (DeliveryConfiguration): Delivery tracking settings
+        logger (logging.Logger): Logger instance for tracker operations
+    """
+    def __init__(self, configuration: DeliveryConfiguration):
+        """
+        Initialize the tracker and load the stored delivery ids if persistence is enabled.
+
+        Args:
+            configuration (DeliveryConfiguration): Delivery tracking settings
+        """
+        self.configuration = configuration
+        self.logger = logging.getLogger(DeliveryTracker.__name__)
+        self._lock = threading.Lock()
+        self._seen: OrderedDict[str, float] = OrderedDict()
+        self._ttl = configuration.ttl_hours * 60 * 60
+        self._hits = 0
+        self._connection = None
+        if not configuration.enabled or not configuration.persistent:
+            return
+        directory = os.path.dirname(configuration.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(configuration.path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS deliveries (
+                delivery_id TEXT PRIMARY KEY,
+                seen_at REAL NOT NULL
+            )""")
+        self._connection.execute("DELETE FROM deliveries WHERE seen_at < ?", (time.time() - self._ttl,))
+        rows = self._connection.execute("SELECT delivery_id, seen_at FROM deliveries ORDER BY seen_at DESC LIMIT ?",
+                                        (configuration.max_entries,)).fetchall()
+        for delivery_id, seen_at in reversed(rows):
+            self._seen[delivery_id] = seen_at
+
+    def add(self, delivery_id: str) -> bool:
+        """
+        Record a delivery id.
+
+        Args:
+            delivery_id (str): Delivery id of the webhook, may be None
+
+        Returns:
+            bool: False if the delivery was already seen (a redelivery), True otherwise
+        """
+        if not self.configuration.enabled or not delivery_id:
+            return True
+        now = time.time()
+        with self._lock:
+            self.__evict(now)
+            if delivery_id in self._seen:
+                self._hits += 1
+                return False
+            self._seen[delivery_id] = now
+            if self._connection is not None:
+                self._connection.execute("INSERT OR REPLACE INTO deliveries (delivery_id, seen_at) VALUES (?, ?)", (delivery_id, now))
+        return True
+
+    def discard(self, delivery_id: str) -> None:
+        """
+        Forget a delivery id, so a redelivery is processed (used when the delivery failed).
+
+        Args:
+            delivery_id (str): Delivery id of the webhook, may be None
+        """
+        if not self.configuration.enabled or not delivery_id:
+            return
+        with self._lock:
+            self._seen.pop(delivery_id, None)
+            if self._connection is not None:
+                self._connection.execute("DELETE FROM deliveries WHERE delivery_id = ?", (delivery_id,))
+
+    def stats(self) -> dict:
+        """
+        Get tracker statistics.
+
+        Returns:
+            dict: Redeliveries answered without enqueueing (hits) and count of tracked delivery ids
+        """
+        with self._lock:
+            return {"hits": self._hits, "entries": len(self._seen)}
+
+    def __evict(self, now: float) -> None:
+        """
+        Drop expired delivery ids and the oldest ones above `max_entries`. Must be called under the lock.
+        """
+        expired_before = now - self._ttl
+        evicted_before = None
+        while self._seen:
+            delivery_id, seen_at = next(iter(self._seen.items()))
+            if seen_at >= expired_before and len(self._seen) < self.configuration.max_entries:
+                break
+            self._seen.popitem(last=False)
+            evicted_before = seen_at
+        if evicted_before is not None and self._connection is not None:
+            self._connection.execute("DELETE FROM deliveries WHERE seen_at <= ?", (evicted_before,))
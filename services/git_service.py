@@ -1,6 +1,10 @@
 from abc import ABC, abstractmethod
+from datetime import datetime
+import logging
 
 from contracts.per_file_review_result import PerFileReviewResult
+from contracts.pr_file import PrFile
+from contracts.pr_metadata import PrMetadata
 from contracts.pr_url import PrUrl
 
 
@@ -11,6 +15,8 @@ class GitService(ABC):
     This class defines the contract for Git service implementations,
     requiring them to provide functionality for PR diffs, comments, and user access control.
     """
+    NAME: str = None # Name of the service in review tasks and metrics
+    MAX_COMMENT_LENGTH: int = 65536 # Longest comment body accepted by the service
     @abstractmethod
     def get_pr_diff(self, pr_url : PrUrl) -> str:
         """
@@ -23,6 +29,64 @@ class GitService(ABC):
             str: The diff content as a string
         """
 
+    @abstractmethod
+    def get_pr_files(self, pr_url : PrUrl) -> list[PrFile]:
+        """
+        Get the changed files of a pull request with their sizes (and patches, if the service returns them).
+        
+        Args:
+            pr_url (PrUrl): The pull request URL object containing repository and PR information
+            
+        Returns:
+            list[PrFile]: Changed files, or None if the list is not available (or may be incomplete)
+        """
+
+    def get_pr_review_diff(self, pr_url : PrUrl, ignore_files : list[str]) -> str:
+        """
+        Get the diff of the files of a pull request which are not ignored.
+        
+        The changed files are listed first. If all of them are ignored, nothing is downloaded.
+        If the service returned patches of all reviewed files, the diff is built from them, so ignored
+        files (lock files etc.) are never downloaded. Otherwise the full diff is downloaded.
+        
+        Args:
+            pr_url (PrUrl): The pull request URL object containing repository and PR information
+            ignore_files (list[str]): List of file names excluded from review
+            
+        Returns:
+            str: The diff content as a string, or None if the request fails
+        """
+        logger = logging.getLogger(GitService.__name__)
+        try:
+            files = self.get_pr_files(pr_url)
+        except Exception as e:
+            logger.warning("Error getting changed files of %s/%s #%s, full diff is used: %s", pr_url.owner, pr_url.repo, pr_url.pr_number, e)
+            files = None
+        if files is None:
+            return self.get_pr_diff(pr_url)
+        reviewed_files = [f for f in files if not any(ignore_file in name for name in f.names for ignore_file in ignore_files or [])]
+        logger.info("Pull request has %s changed files (%s lines), %s of them are reviewed",
+                    len(files), sum(f.changes for f in files), len(reviewed_files))
+        if len(reviewed_files) == 0:
+            return ""
+        # Files without patch: binary or too large for the files API (those need the full diff)
+        if all(f.patch is not None or f.changes == 0 for f in reviewed_files):
+            return "".join(f.to_diff_block() for f in reviewed_files)
+        return self.get_pr_diff(pr_url)
+
+    @abstractmethod
+    def get_pr_metadata(self, pr_url : PrUrl) -> PrMetadata:
+        """
+        Get the metadata of a pull request (head commit SHA, state, size) in one request.
+        The metadata is requested once per review task and passed to the steps which need it.
+        
+        Args:
+            pr_url (PrUrl): The pull request URL object containing repository and PR information
+            
+        Returns:
+            PrMetadata: Pull request metadata
+        """
+
     @abstractmethod
     def post_comment(self, pr_url : PrUrl, text : str) -> None:
         """
@@ -31,19 +95,39 @@ class GitService(ABC):
         Args:
             pr_url (PrUrl): The pull request URL object containing repository and PR information
             text (str): The comment text to post
+            
+        Raises:
+            requests.HTTPError: The service rejected the comment
         """
 
     @abstractmethod
-    def create_review(self, pr_url : PrUrl, review_result : list[PerFileReviewResult]) -> str:
+    def get_comments(self, pr_url : PrUrl, since : datetime = None) -> list[str]:
+        """
+        Get the bodies of the comments of a pull request.
+        
+        Args:
+            pr_url (PrUrl): The pull request URL object containing repository and PR information
+            since (datetime, optional): Return only comments updated after this time
+            
+        Returns:
+            list[str]: Comment bodies
+        """
+
+    @abstractmethod
+    def create_review(self, pr_url : PrUrl, review_result : list[PerFileReviewResult], pr_metadata : PrMetadata) -> str:
         """
         Create review in Pull Request
 
         Args:
             pr_url (PrUrl): The pull request URL object containing repository and PR information
             review_result (list[PerFileReviewResult]): Comments to files
+            pr_metadata (PrMetadata): Metadata of the pull request (see `get_pr_metadata`)
         
         Returns:
             str: Review Identifier
+
+        Raises:
+            requests.HTTPError: The service rejected the review (e.g. a comment line outside of the diff)
         """
 
     @abstractmethod
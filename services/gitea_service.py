@@ -1,15 +1,19 @@
+from datetime import datetime, timezone
 import json
 import logging
 import re
 from dataclasses import asdict
 
-import requests
-
+from configuration.diff_configuration import DiffConfiguration
 from configuration.gitea_configuration import GiteaConfiguration
 from contracts.per_file_review_result import PerFileReviewResult
+from contracts.pr_file import PrFile
+from contracts.pr_metadata import PrMetadata
 from contracts.pr_url import PrUrl
 
 from services.git_service import GitService
+from services.http_session_pool import HttpSessionPool
+from utils.download_utils import download_diff, get_paginated
 
 class GiteaService(GitService):
     """
@@ -20,10 +24,15 @@ class GiteaService(GitService):
     
     Attributes:
         configuration (GiteaConfiguration): Configuration for Gitea API access
+        diff_configuration (DiffConfiguration): Limits of downloaded diffs
+        http (HttpSessionPool): Pooled keep-alive sessions used for all API calls
         logger (logging.Logger): Logger instance for service operations
     """
-    def __init__(self, configuration : GiteaConfiguration):
+    NAME: str = "gitea"
+    def __init__(self, configuration : GiteaConfiguration, diff_configuration : DiffConfiguration, http : HttpSessionPool):
         self.configuration = configuration
+        self.diff_configuration = diff_configuration
+        self.http = http
         self.logger = logging.getLogger(GiteaService.__name__)
 
     def get_pr_diff(self, pr_url : PrUrl) -> str:
@@ -41,12 +50,53 @@ class GiteaService(GitService):
             "Authorization": f"token {self.configuration.token}",
             "Accept": "application/json",
         }
-        response = requests.get(diff_url, headers=headers, timeout=60 * 2) # get diff request with 2 minutes timeout
+        response = self.http.get(diff_url, headers=headers, timeout=60 * 2, stream=True) # get diff request with 2 minutes timeout
         if response.status_code == 200:
-            return response.text
+            return download_diff(response, self.diff_configuration.spool_threshold_mb * 1024 * 1024, self.diff_configuration.max_size_mb * 1024 * 1024)
         self.logger.error("Error getting diff for %s. Status=%s.\n%s", diff_url, response.status_code, response.text)
         return None
 
+    def get_pr_files(self, pr_url : PrUrl) -> list[PrFile]:
+        """
+        Get the changed files of a Gitea pull request.
+        Gitea does not return patches of files, so reviewed files are taken from the full diff.
+        
+        Args:
+            pr_url (PrUrl): The pull request URL object containing repository and PR information
+            
+        Returns:
+            list[PrFile]: Changed files (without patches)
+        """
+        files_url = f"{self.configuration.base_url}/api/v1/repos/{pr_url.owner}/{pr_url.repo}/pulls/{pr_url.pr_number}/files"
+        headers = {
+            "Authorization": f"token {self.configuration.token}",
+            "Accept": "application/json",
+        }
+        items = get_paginated(self.http, files_url, headers, {"limit": 50})
+        return [PrFile(item["filename"], item.get("status"), item.get("additions", 0), item.get("deletions", 0), item.get("changes", 0),
+                       item.get("previous_filename") or None) for item in items]
+
+    def get_pr_metadata(self, pr_url : PrUrl) -> PrMetadata:
+        """
+        Get the metadata of a Gitea pull request.
+        
+        Args:
+            pr_url (PrUrl): The pull request URL object containing repository and PR information
+            
+        Returns:
+            PrMetadata: Head commit SHA, state, draft flag and size of the pull request
+        """
+        url = f"{self.configuration.base_url}/api/v1/repos/{pr_url.owner}/{pr_url.repo}/pulls/{pr_url.pr_number}"
+        headers = {
+            "Authorization": f"token {self.configuration.token}",
+            "Accept": "application/json",
+        }
+        response = self.http.get(url, headers=headers, timeout=60 * 2)
+        response.raise_for_status()
+        pr_data = response.json()
+        return PrMetadata(pr_data["head"]["sha"], pr_data.get("state"), pr_data.get("draft", False),
+                          pr_data.get("additions", 0), pr_data.get("deletions", 0), pr_data.get("changed_files", 0))
+
     def post_comment(self, pr_url : PrUrl, text : str) -> None:
         """
         Post a comment to a Gitea pull request.
@@ -54,6 +104,9 @@ class GiteaService(GitService):
         Args:
             pr_url (PrUrl): The pull request URL object containing repository and PR information
             text (str): The comment text to post
+            
+        Raises:
+            requests.HTTPError: Gitea rejected the comment
         """
         comment_url = f"{self.configuration.base_url}/api/v1/repos/{pr_url.owner}/{pr_url.repo}/issues/{pr_url.pr_number}/comments"
         headers = {
@@ -64,10 +117,32 @@ class GiteaService(GitService):
         payload = {
             "body": text
         }
-        response = requests.post(comment_url, json=payload, headers=headers, timeout=60 * 2) # send comment with 2 minutes timeout
+        response = self.http.post(comment_url, json=payload, headers=headers, timeout=60 * 2) # send comment with 2 minutes timeout
         if response.status_code in (200,201):
             return
         self.logger.error("Error post comment to %s/%s #%s. Status=%s.\n%s", pr_url.owner, pr_url.repo, pr_url.pr_number, response.status_code, response.text)
+        response.raise_for_status()
+
+    def get_comments(self, pr_url : PrUrl, since : datetime = None) -> list[str]:
+        """
+        Get the bodies of the comments of a Gitea pull request.
+        
+        Args:
+            pr_url (PrUrl): The pull request URL object containing repository and PR information
+            since (datetime, optional): Return only comments updated after this time
+            
+        Returns:
+            list[str]: Comment bodies
+        """
+        comments_url = f"{self.configuration.base_url}/api/v1/repos/{pr_url.owner}/{pr_url.repo}/issues/{pr_url.pr_number}/comments"
+        headers = {
+            "Authorization": f"token {self.configuration.token}",
+            "Accept": "application/json",
+        }
+        params = {"limit": 50}
+        if since is not None:
+            params["since"] = since.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        return [comment.get("body") or "" for comment in get_paginated(self.http, comments_url, headers, params)]
 
     def is_allowed_user(self, login: str) -> bool:
         """
@@ -87,7 +162,7 @@ class GiteaService(GitService):
         parsed_allowed_emails = re.split(r'[;,]\s*', self.configuration.allowed_emails.lower())
         return login.lower() in parsed_allowed_emails
 
-    def create_review(self, pr_url : PrUrl, review_result : list[PerFileReviewResult]) -> str:
+    def create_review(self, pr_url : PrUrl, review_result : list[PerFileReviewResult], pr_metadata : PrMetadata) -> str:
         create_review_url = f"{self.configuration.base_url}/api/v1/repos/{pr_url.owner}/{pr_url.repo}/pulls/{pr_url.pr_number}/reviews"
         headers = {
             "Authorization": f"token {self.configuration.token}",
@@ -102,10 +177,10 @@ class GiteaService(GitService):
         for comment in payload["comments"]:
             comment["new_position"] = comment["line"]
             del comment["line"]
-        response = requests.post(create_review_url, json=payload, headers=headers, timeout=60 * 2) # send comment with 2 minutes timeout
-        if response.status_code != 200:
+        response = self.http.post(create_review_url, json=payload, headers=headers, timeout=60 * 2) # send comment with 2 minutes timeout
+        if response.status_code not in (200, 201):
             self.logger.error("Error creating review for %s. Status=%s.\n%s\n%s", create_review_url, response.status_code, response.text, json.dumps(payload))
-            return None
+            response.raise_for_status()
         response_json : dict = response.json()
         return response_json.get("id")
 
@@ -120,7 +195,7 @@ class GiteaService(GitService):
             "event": "COMMENT",
             "body": "🤖 AI Code Review Per File completed!"
         }
-        response = requests.post(complete_review_url, json=payload, headers=headers, timeout=60 * 2) # send comment with 2 minutes timeout
+        response = self.http.post(complete_review_url, json=payload, headers=headers, timeout=60 * 2) # send comment with 2 minutes timeout
         if response.status_code in (200,201):
             return
         self.logger.error("Error completing review for %s. Status=%s.\n%s", complete_review_url, response.status_code, response.text)
@@ -1,15 +1,19 @@
 from dataclasses import asdict
+from datetime import datetime, timezone
 import json
 import logging
 import re
 
-import requests
-
+from configuration.diff_configuration import DiffConfiguration
 from configuration.github_configuration import GithubConfiguration
 from contracts.per_file_review_result import PerFileReviewResult
+from contracts.pr_file import PrFile
+from contracts.pr_metadata import PrMetadata
 from contracts.pr_url import PrUrl
 
 from services.git_service import GitService
+from services.http_session_pool import HttpSessionPool
+from utils.download_utils import download_diff, get_paginated
 
 class GithubService(GitService):
     """
@@ -20,10 +24,17 @@ class GithubService(GitService):
     
     Attributes:
         configuration (GithubConfiguration): Configuration for GitHub API access
+        diff_configuration (DiffConfiguration): Limits of downloaded diffs
+        http (HttpSessionPool): Pooled keep-alive sessions used for all API calls
         logger (logging.Logger): Logger instance for service operations
     """
-    def __init__(self, configuration : GithubConfiguration):
+    NAME: str = "github"
+    MAX_LISTED_FILES: int = 3000 # The files API lists at most 3000 files of a pull request
+
+    def __init__(self, configuration : GithubConfiguration, diff_configuration : DiffConfiguration, http : HttpSessionPool):
         self.configuration = configuration
+        self.diff_configuration = diff_configuration
+        self.http = http
         self.logger = logging.getLogger(GithubService.__name__)
 
     def get_pr_diff(self, pr_url : PrUrl) -> str:
@@ -41,12 +52,33 @@ class GithubService(GitService):
             "Authorization": f"token {self.configuration.token}",
             "Accept": "application/vnd.github.v3.diff",
         }
-        response = requests.get(diff_url, headers=headers, timeout=60 * 2) # get diff request with 2 minutes timeout
+        response = self.http.get(diff_url, headers=headers, timeout=60 * 2, stream=True) # get diff request with 2 minutes timeout
         if response.status_code == 200:
-            return response.text
+            return download_diff(response, self.diff_configuration.spool_threshold_mb * 1024 * 1024, self.diff_configuration.max_size_mb * 1024 * 1024)
         self.logger.error("Error getting diff for %s. Status=%s.\n%s", diff_url, response.status_code, response.text)
         return None
 
+    def get_pr_files(self, pr_url : PrUrl) -> list[PrFile]:
+        """
+        Get the changed files of a GitHub pull request with their patches.
+        
+        Args:
+            pr_url (PrUrl): The pull request URL object containing repository and PR information
+            
+        Returns:
+            list[PrFile]: Changed files, or None if the pull request has more files than the API lists
+        """
+        files_url = f"https://api.github.com/repos/{pr_url.owner}/{pr_url.repo}/pulls/{pr_url.pr_number}/files"
+        headers = {
+            "Authorization": f"token {self.configuration.token}",
+            "Accept": "application/vnd.github.v3+json",
+        }
+        items = get_paginated(self.http, files_url, headers, {"per_page": 100})
+        if len(items) >= self.MAX_LISTED_FILES:
+            return None
+        return [PrFile(item["filename"], item.get("status"), item.get("additions", 0), item.get("deletions", 0), item.get("changes", 0),
+                       item.get("previous_filename"), item.get("patch")) for item in items]
+
     def post_comment(self, pr_url : PrUrl, text : str) -> None:
         """
         Post a comment to a GitHub pull request.
@@ -54,6 +86,9 @@ class GithubService(GitService):
         Args:
             pr_url (PrUrl): The pull request URL object containing repository and PR information
             text (str): The comment text to post
+            
+        Raises:
+            requests.HTTPError: GitHub rejected the comment
         """
         comment_url = f"https://api.github.com/repos/{pr_url.owner}/{pr_url.repo}/issues/{pr_url.pr_number}/comments"
         headers = {
@@ -65,10 +100,32 @@ class GithubService(GitService):
         payload = {
             "body": text
         }
-        response = requests.post(comment_url, json=payload, headers=headers, timeout=60 * 2) # send comment with 2 minutes timeout
+        response = self.http.post(comment_url, json=payload, headers=headers, timeout=60 * 2) # send comment with 2 minutes timeout
         if response.status_code in (200,201):
             return
         self.logger.error("Error post comment to %s/%s #%s. Status=%s.\n%s", pr_url.owner, pr_url.repo, pr_url.pr_number, response.status_code, response.text)
+        response.raise_for_status()
+
+    def get_comments(self, pr_url : PrUrl, since : datetime = None) -> list[str]:
+        """
+        Get the bodies of the comments of a GitHub pull request.
+        
+        Args:
+            pr_url (PrUrl): The pull request URL object containing repository and PR information
+            since (datetime, optional): Return only comments updated after this time
+            
+        Returns:
+            list[str]: Comment bodies
+        """
+        comments_url = f"https://api.github.com/repos/{pr_url.owner}/{pr_url.repo}/issues/{pr_url.pr_number}/comments"
+        headers = {
+            "Authorization": f"token {self.configuration.token}",
+            "Accept": "application/vnd.github.v3+json",
+        }
+        params = {"per_page": 100}
+        if since is not None:
+            params["since"] = since.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        return [comment.get("body") or "" for comment in get_paginated(self.http, comments_url, headers, params)]
 
     def is_allowed_user(self, login: str) -> bool:
         """
@@ -88,38 +145,47 @@ class GithubService(GitService):
         parsed_allowed_logins = re.split(r'[;,]\s*', self.configuration.allowed_logins.lower())
         return login.lower() in parsed_allowed_logins
 
-    def create_review(self, pr_url : PrUrl, review_result: list[PerFileReviewResult]) -> str:
-        latest_commit_sha = self.__get_latest_commit_sha(pr_url)
+    def create_review(self, pr_url : PrUrl, review_result: list[PerFileReviewResult], pr_metadata : PrMetadata) -> str:
         create_review_url = f"https://api.github.com/repos/{pr_url.owner}/{pr_url.repo}/pulls/{pr_url.pr_number}/reviews"
         headers = {
             "Authorization": f"token {self.configuration.token}",
             "Accept": "application/vnd.github.v3+json"
         }
         payload = {
-            "commit_id": latest_commit_sha,
+            "commit_id": pr_metadata.head_sha,
             "body": "🤖 AI Code Per File Reviewed!",
             "event": "COMMENT", 
             "comments": [asdict(r) for r in review_result]
         }
-        response = requests.post(create_review_url, json=payload, headers=headers, timeout=60 * 2) # send comment with 2 minutes timeout
-        if response.status_code != 200:
+        response = self.http.post(create_review_url, json=payload, headers=headers, timeout=60 * 2) # send comment with 2 minutes timeout
+        if response.status_code not in (200, 201):
             self.logger.error("Error creating review for %s. Status=%s.\n%s\n%s", create_review_url, response.status_code, response.text, json.dumps(payload))
-            return None
+            response.raise_for_status()
         response_json : dict = response.json()
         return response_json.get("id")
     
     def complete_review(self, pr_url : PrUrl, review_identifier : str) -> None:
         pass
 
-    def __get_latest_commit_sha(self, pr_url: PrUrl) -> str:
+    def get_pr_metadata(self, pr_url: PrUrl) -> PrMetadata:
+        """
+        Get the metadata of a GitHub pull request.
+        
+        Args:
+            pr_url (PrUrl): The pull request URL object containing repository and PR information
+            
+        Returns:
+            PrMetadata: Head commit SHA, state, draft flag and size of the pull request
+        """
         url = f"https://api.github.com/repos/{pr_url.owner}/{pr_url.repo}/pulls/{pr_url.pr_number}"
         headers = {
             "Authorization": f"token {self.configuration.token}",
             "Accept": "application/vnd.github.v3+json"
         }
         
-        response = requests.get(url, headers=headers, timeout=60 * 2)
+        response = self.http.get(url, headers=headers, timeout=60 * 2)
         response.raise_for_status()
         
         pr_data = response.json()
-        return pr_data["head"]["sha"]
\ No newline at end of file
+        return PrMetadata(pr_data["head"]["sha"], pr_data.get("state"), pr_data.get("draft", False),
+                          pr_data.get("additions", 0), pr_data.get("deletions", 0), pr_data.get("changed_files", 0))
\ No newline at end of file
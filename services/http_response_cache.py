@@ -0,0 +1,176 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+@dataclass
+class CachedResponse:
+    """
+    Response stored for conditional requests.
+
+    Attributes:
+        url (str): Final url of the response
+        headers (dict): Response headers
+        content (bytes): Response body
+        encoding (Optional[str]): Encoding of the body declared by the response
+        etag (Optional[str]): Value of the `ETag` header
+        last_modified (Optional[str]): Value of the `Last-Modified` header
+    """
+    url: str
+    headers: dict
+    content: bytes
+    encoding: Optional[str]
+    etag: Optional[str]
+    last_modified: Optional[str]
+
+class HttpResponseCache:
+    """
+    Bounded in-memory store of GET responses with validators (`ETag`, `Last-Modified`) for conditional requests.
+
+    A stored response makes the next request for the same resource conditional (`If-None-Match`,
+    `If-Modified-Since`). When the server answers `304 Not Modified` (which GitHub does not count
+    against the rate limit) the stored response is returned. Least recently used responses are evicted
+    above `max_entries` or `max_size` bytes. Responses larger than a quarter of `max_size` are not stored.
+
+    Attributes:
+        max_entries (int): Maximal count of stored responses
+        max_size (int): Maximal total size (bytes) of stored bodies
+    """
+    MAX_ENTRY_RATIO: float = 0.25
+
+    def __init__(self, max_entries: int, max_size: int):
+        """
+        Initialize an empty cache.
+
+        Args:
+            max_entries (int): Maximal count of stored responses
+            max_size (int): Maximal total size (bytes) of stored bodies
+        """
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, CachedResponse] = OrderedDict()
+        self._max_entry_size = int(max_size * self.MAX_ENTRY_RATIO)
+        self._size = 0
+        self._hits = 0
+        self._misses = 0
+
+    @staticmethod
+    def key(url: str, params: Optional[dict], headers: Optional[dict]) -> str:
+        """
+        Build the key of a request. Requests with other credentials or media types are stored separately.
+
+        Args:
+            url (str): Request url
+            params (Optional[dict]): Query parameters
+            headers (Optional[dict]): Request headers
+
+        Returns:
+            str: SHA-256 hex digest of the url, parameters, `Authorization` and `Accept` headers
+        """
+        headers = CaseInsensitiveDict(headers or {})
+        parts = [url, repr(sorted((params or {}).items())), headers.get("Authorization", ""), headers.get("Accept", "")]
+        return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+    def conditional_headers(self, key: str) -> dict:
+        """
+        Get the validator headers for a request.
+
+        Args:
+            key (str): Request key (see `key`)
+
+        Returns:
+            dict: `If-None-Match` / `If-Modified-Since` headers, empty if nothing is stored
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return {}
+        headers = {}
+        if entry.etag is not None:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified is not None:
+            headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def resolve(self, key: str, response: requests.Response) -> requests.Response:
+        """
+        Serve a `304 Not Modified` response from the store, or store a new response.
+
+        Args:
+            key (str): Request key (see `key`)
+            response (requests.Response): Response of the (conditional) request
+
+        Returns:
+            requests.Response: The stored response for a 304 answer, otherwise the given response
+        """
+        if response.status_code == 304:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+            if entry is not None:
+                response.close()
+                return self.__to_response(entry)
+            return response
+        with self._lock:
+            self._misses += 1
+        if response.status_code != 200:
+            return response
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if etag is None and last_modified is None:
+            return response
+        content_length = response.headers.get("Content-Length")
+        # Streamed responses are stored only when their size is known and fits, otherwise they stay streamed
+        if not response._content_consumed and (content_length is None or not content_length.isdigit() or int(content_length) > self._max_entry_size):
+            return response
+        content = response.content
+        if len(content) > self._max_entry_size:
+            return response
+        entry = CachedResponse(response.url, dict(response.headers), content, response.encoding, etag, last_modified)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous.content)
+            self._entries[key] = entry
+            self._size += len(content)
+            while len(self._entries) > self.max_entries or self._size > self.max_size:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted.content)
+        return response
+
+    def stats(self) -> dict:
+        """
+        Get cache statistics.
+
+        Returns:
+            dict: Responses served from the store (hits), full responses (misses), entries count and stored size in bytes
+        """
+        with self._lock:
+            return {"hits": self._hits, "misses": self._misses, "entries": len(self._entries), "size_bytes": self._size}
+
+    @staticmethod
+    def __to_response(entry: CachedResponse) -> requests.Response:
+        """
+        Build a response object from a stored response.
+
+        Args:
+            entry (CachedResponse): Stored response
+
+        Returns:
+            requests.Response: Response with status 200 and the stored body
+        """
+        response = requests.Response()
+        response.status_code = 200
+        response.url = entry.url
+        response.headers = CaseInsensitiveDict(entry.headers)
+        response.encoding = entry.encoding
+        response._content = entry.content
+        response._content_consumed = True
+        return response
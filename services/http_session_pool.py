@@ -0,0 +1,142 @@
+import logging
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from configuration.http_configuration import HttpConfiguration
+from services.http_response_cache import HttpResponseCache
+
+class HttpSessionPool:
+    """
+    Shared keep-alive HTTP sessions, one for each host (scheme, host and port).
+
+    Every session keeps up to `pool_size` open connections to its host, so consecutive
+    requests (diff, metadata, dozens of review comments) reuse connections instead of
+    doing a TCP and TLS handshake each time. Idempotent requests are retried with exponential
+    backoff on connection errors and on 429/5xx responses, honoring `Retry-After`.
+    GET responses with `ETag`/`Last-Modified` are kept in a bounded cache and requested again
+    conditionally (see `HttpResponseCache`). Sessions are safe to share between worker threads.
+
+    Attributes:
+        configuration (HttpConfiguration): Pool size, retry and cache settings
+        cache (HttpResponseCache): Cache of GET responses, or None if disabled
+        logger (logging.Logger): Logger instance for pool operations
+    """
+    RETRY_STATUS_CODES: tuple = (429, 500, 502, 503, 504)
+
+    def __init__(self, configuration: HttpConfiguration):
+        """
+        Initialize the pool. Sessions are created on the first request to a host.
+
+        Args:
+            configuration (HttpConfiguration): Pool size, retry and cache settings
+        """
+        self.configuration = configuration
+        self.cache = HttpResponseCache(configuration.cache_max_entries, configuration.cache_max_size_mb * 1024 * 1024) if configuration.cache_enabled else None
+        self.logger = logging.getLogger(HttpSessionPool.__name__)
+        self._lock = threading.Lock()
+        self._sessions: dict[str, requests.Session] = {}
+        self._retries: dict[str, int] = {}
+
+    def session(self, url: str) -> requests.Session:
+        """
+        Get the session for the host of a url.
+
+        Args:
+            url (str): Request url
+
+        Returns:
+            requests.Session: Session with pooled connections to the host
+        """
+        parts = urlsplit(url)
+        host = f"{parts.scheme}://{parts.netloc}".lower()
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = self.__create_session()
+                self._sessions[host] = session
+                self.logger.info("HTTP session created for %s (pool size=%s)", host, self.configuration.pool_size)
+            return session
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Send a request through the session of the url host.
+
+        Args:
+            method (str): HTTP method
+            url (str): Request url
+            **kwargs: Arguments of `requests.Session.request` (headers, json, timeout etc.)
+
+        Returns:
+            requests.Response: The response
+        """
+        response = self.session(url).request(method, url, **kwargs)
+        # urllib3 keeps the retries done for the response in the history of its Retry object
+        retries = getattr(response.raw, "retries", None)
+        if retries is not None and len(retries.history) > 0:
+            parts = urlsplit(url)
+            host = f"{parts.scheme}://{parts.netloc}".lower()
+            with self._lock:
+                self._retries[host] = self._retries.get(host, 0) + len(retries.history)
+        return response
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """
+        Send a GET request (see `request`). A request for a cached resource is sent as a conditional request,
+        and a `304 Not Modified` answer is served from the cache.
+        """
+        if self.cache is None:
+            return self.request("GET", url, **kwargs)
+        key = HttpResponseCache.key(url, kwargs.get("params"), kwargs.get("headers"))
+        headers = {**(kwargs.pop("headers", None) or {}), **self.cache.conditional_headers(key)}
+        return self.cache.resolve(key, self.request("GET", url, headers=headers, **kwargs))
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        """
+        Send a POST request (see `request`).
+        """
+        return self.request("POST", url, **kwargs)
+
+    def stats(self) -> dict:
+        """
+        Get connection reuse statistics of every host.
+
+        Returns:
+            dict: Statistics by host: requests sent (including retries), retries, connections opened
+                and requests served by a reused connection
+        """
+        with self._lock:
+            sessions = dict(self._sessions)
+            retries = dict(self._retries)
+        stats = {}
+        for host, session in sessions.items():
+            adapter: HTTPAdapter = session.get_adapter(host)
+            requests_count = 0
+            connections = 0
+            for key in list(adapter.poolmanager.pools.keys()):
+                pool = adapter.poolmanager.pools.get(key)
+                if pool is None:
+                    continue
+                requests_count += pool.num_requests
+                connections += pool.num_connections
+            stats[host] = {"requests": requests_count, "retries": retries.get(host, 0), "connections": connections,
+                           "reused": max(requests_count - connections, 0)}
+        return stats
+
+    def __create_session(self) -> requests.Session:
+        """
+        Create a session with a pooled, retrying adapter.
+
+        Returns:
+            requests.Session: New session
+        """
+        retry = Retry(total=self.configuration.retries, backoff_factor=self.configuration.backoff_factor,
+                      status_forcelist=self.RETRY_STATUS_CODES, respect_retry_after_header=True, raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.configuration.pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
@@ -0,0 +1,198 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional, Union
+
+class MetricsService:
+    """
+    Thread-safe in-process collector of service metrics, rendered in the Prometheus text format.
+
+    Counters and histograms are updated by the services while they work (one lock, no allocation
+    on the hot path except the label key). Statistics of other components (queue depth, worker pool,
+    caches, connection pools) are read only when metrics are rendered, by registered collectors.
+
+    Metric names are prefixed with `ai_reviewer_`. Counters get the `_total` suffix.
+    """
+    PREFIX: str = "ai_reviewer_"
+    BUCKETS: tuple[float, ...] = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+    CHUNK_BUCKETS: tuple[float, ...] = (1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+    DESCRIPTIONS: dict[str, str] = {
+        "stage_seconds": "Duration of review stages",
+        "queue_wait_seconds": "Time between enqueueing a review task and the start of its processing",
+        "review_chunks": "Count of diff chunks sent to the language model in one review",
+        "errors": "Failed operations by component and operation",
+        "retries": "Retried operations by component and operation",
+        "reviews": "Processed review tasks by git service and result",
+    }
+
+    def __init__(self):
+        """
+        Initialize an empty metrics registry.
+        """
+        self._lock = threading.Lock()
+        self._counters: dict[str, dict[tuple, float]] = {}
+        self._histograms: dict[str, tuple[tuple[float, ...], dict[tuple, list]]] = {}
+        self._collectors: list[Callable[[], Iterator[tuple]]] = []
+
+    def inc(self, name: str, labels: Optional[dict] = None, value: float = 1) -> None:
+        """
+        Increase a counter.
+
+        Args:
+            name (str): Counter name without prefix and `_total` suffix
+            labels (Optional[dict]): Label values
+            value (float): Increment
+        """
+        key = tuple(sorted(labels.items())) if labels else ()
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, labels: Optional[dict] = None, buckets: tuple[float, ...] = BUCKETS) -> None:
+        """
+        Add an observation to a histogram.
+
+        Args:
+            name (str): Histogram name without prefix
+            value (float): Observed value
+            labels (Optional[dict]): Label values
+            buckets (tuple[float, ...]): Upper bounds of the buckets, used when the histogram is created
+        """
+        key = tuple(sorted(labels.items())) if labels else ()
+        with self._lock:
+            bounds, series = self._histograms.setdefault(name, (buckets, {}))
+            # Bucket counts (not cumulative), then sum and count
+            values = series.get(key)
+            if values is None:
+                values = series[key] = [0] * (len(bounds) + 3)
+            values[bisect_left(bounds, value)] += 1
+            values[-2] += value
+            values[-1] += 1
+
+    @contextmanager
+    def stage(self, stage: str, component: str):
+        """
+        Measure the duration of a review stage. A failed stage is counted as an error of the component.
+
+        Args:
+            stage (str): Stage name (e.g. `diff_fetch`, `llm`, `publish`)
+            component (str): Component doing the work (git service or language model backend)
+        """
+        started = time.monotonic()
+        try:
+            yield
+        except Exception:
+            self.inc("errors", {"component": component, "operation": stage})
+            raise
+        finally:
+            self.observe("stage_seconds", time.monotonic() - started, {"stage": stage, "component": component})
+
+    def add_collector(self, collector: Callable[[], Iterator[tuple]]) -> None:
+        """
+        Register a function reporting metrics of a component when metrics are rendered.
+
+        Args:
+            collector (Callable[[], Iterator[tuple]]): Function yielding `(name, type, labels, value)`,
+                where type is `gauge` or `counter`
+        """
+        with self._lock:
+            self._collectors.append(collector)
+
+    def add_stats_collector(self, name: str, stats: Callable[[], dict], counters: tuple[str, ...] = (),
+                            label: Union[str, tuple[str, ...]] = None) -> None:
+        """
+        Register a `stats()` method of a component as a collector.
+
+        Args:
+            name (str): Metric name prefix of the component (e.g. `llm_cache`)
+            stats (Callable[[], dict]): Function returning numeric statistics. If `label` is set,
+                it returns statistics by label value (e.g. by host)
+            counters (tuple[str, ...]): Statistics growing monotonically, reported as counters
+            label (Union[str, tuple[str, ...]]): Label name of the keys of nested statistics
+                (label names, if the keys are tuples)
+        """
+        def collect():
+            values = stats()
+            groups = values.items() if label is not None else [(None, values)]
+            for label_value, group in groups:
+                if label is None:
+                    labels = None
+                else:
+                    labels = dict(zip(label, label_value)) if isinstance(label, tuple) else {label: label_value}
+                for key, value in group.items():
+                    if isinstance(value, (int, float)) and not isinstance(value, bool):
+                        yield f"{name}_{key}", "counter" if key in counters else "gauge", labels, value
+        self.add_collector(collect)
+
+    def render(self) -> str:
+        """
+        Render all metrics in the Prometheus text exposition format.
+
+        Returns:
+            str: Metrics text
+        """
+        with self._lock:
+            counters = {name: dict(series) for name, series in self._counters.items()}
+            histograms = {name: (bounds, {key: list(values) for key, values in series.items()})
+                          for name, (bounds, series) in self._histograms.items()}
+            collectors = list(self._collectors)
+        lines = []
+        for name, series in sorted(counters.items()):
+            self.__header(lines, f"{name}_total", "counter", name)
+            for key, value in series.items():
+                lines.append(f"{self.PREFIX}{name}_total{self.__labels(key)} {self.__number(value)}")
+        for name, (bounds, series) in sorted(histograms.items()):
+            self.__header(lines, name, "histogram", name)
+            for key, values in series.items():
+                cumulative = 0
+                for bound, count in zip(bounds + (float("inf"),), values):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else self.__number(bound)
+                    lines.append(f"{self.PREFIX}{name}_bucket{self.__labels(key + (('le', le),))} {cumulative}")
+                lines.append(f"{self.PREFIX}{name}_sum{self.__labels(key)} {self.__number(values[-2])}")
+                lines.append(f"{self.PREFIX}{name}_count{self.__labels(key)} {values[-1]}")
+        collected: dict[str, tuple[str, list]] = {}
+        for collector in collectors:
+            try:
+                for name, metric_type, labels, value in collector():
+                    collected.setdefault(name, (metric_type, []))[1].append((tuple(sorted(labels.items())) if labels else (), value))
+            except Exception as e:
+                lines.append(f"# collector error: {e.__class__.__name__}")
+        for name, (metric_type, samples) in sorted(collected.items()):
+            full_name = f"{name}_total" if metric_type == "counter" else name
+            self.__header(lines, full_name, metric_type, name)
+            for key, value in samples:
+                lines.append(f"{self.PREFIX}{full_name}{self.__labels(key)} {self.__number(value)}")
+        return "\n".join(lines) + "\n"
+
+    def __header(self, lines: list[str], full_name: str, metric_type: str, name: str) -> None:
+        """
+        Append the HELP and TYPE lines of a metric.
+        """
+        lines.append(f"# HELP {self.PREFIX}{full_name} {self.DESCRIPTIONS.get(name, name.replace('_', ' ').capitalize())}")
+        lines.append(f"# TYPE {self.PREFIX}{full_name} {metric_type}")
+
+    @staticmethod
+    def __labels(key: tuple) -> str:
+        """
+        Format label pairs, escaping the values.
+        """
+        if not key:
+            return ""
+        pairs = ",".join(f'{k}="{MetricsService.__escape(v)}"' for k, v in key)
+        return "{" + pairs + "}"
+
+    @staticmethod
+    def __escape(value) -> str:
+        """
+        Escape a label value.
+        """
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    @staticmethod
+    def __number(value: float) -> str:
+        """
+        Format a sample value.
+        """
+        return str(int(value)) if float(value).is_integer() else repr(float(value))
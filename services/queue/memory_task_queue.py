@@ -1,5 +1,7 @@
 import threading
 import logging
+from collections import deque
+from typing import Optional
 from services.queue.task_queue import TaskQueue
 
 class InMemoryTaskQueue(TaskQueue):
@@ -8,42 +10,125 @@ class InMemoryTaskQueue(TaskQueue):
     
     This class provides thread-safe queue operations using Python's threading module.
     It stores tasks in memory and is suitable for single-process applications.
+    Requests for a pull request which is already queued are merged into the queued task,
+    and a pull request is never handed to two workers at the same time.
     
     Attributes:
-        _queue (list): The list storing queued tasks
-        _lock (threading.Lock): Lock for thread-safe operations
+        _queue (deque): The deque storing queued tasks
+        _queued (dict): Queued tasks by coalesce key
+        _in_progress (set): Coalesce keys of tasks being processed by workers
+        _condition (threading.Condition): Condition for thread-safe operations and waking up waiting consumers
         logger (logging.Logger): Logger instance for queue operations
     """
     def __init__(self):
         """
         Initialize the in-memory task queue.
         
-        Creates an empty queue and initializes the threading lock and logger.
+        Creates an empty queue and initializes the threading condition and logger.
         """
-        self._queue = []
-        self._lock = threading.Lock()
+        self._queue = deque()
+        self._queued = {}
+        self._in_progress = set()
+        self._condition = threading.Condition()
         self.logger = logging.getLogger(InMemoryTaskQueue.__name__)
 
     def enqueue(self, task):
         """
-        Add a task to the queue.
+        Add a task to the queue and wake up one waiting consumer.
+        If a task for the same pull request is already queued, the new one is merged into it.
         
         Args:
             task (object): The task object to be added to the queue
         """
-        with self._lock:
+        with self._condition:
+            queued_task = self._queued.get(task.coalesce_key)
+            if queued_task is not None:
+                queued_task.merge(task)
+                self.logger.debug("Task merged into queued %s", task.coalesce_key)
+                return
             self._queue.append(task)
+            self._queued[task.coalesce_key] = task
             self.logger.debug("Task enqueued %s", task.__class__.__name__)
+            self._condition.notify()
 
-    def dequeue(self):
+    def dequeue(self, timeout: Optional[float] = 0):
         """
         Remove and return a task from the queue.
+        Tasks for pull requests which are in progress wait until the running review completes.
+        
+        Args:
+            timeout (Optional[float]): Seconds to wait for a task when the queue is empty.
+                `0` returns immediately, `None` waits until a task is enqueued
         
         Returns:
             object: The next task in the queue, or None if the queue is empty
         """
-        with self._lock:
-            if not self._queue:
+        with self._condition:
+            # The predicate must not return the index itself: index 0 would read as "not ready"
+            if not self._condition.wait_for(lambda: self.__find_ready_task() is not None, timeout=timeout):
                 self.logger.debug("Queue is empty")
                 return None
-            return self._queue.pop(0)
+            index = self.__find_ready_task()
+            task = self._queue[index]
+            del self._queue[index]
+            del self._queued[task.coalesce_key]
+            self._in_progress.add(task.coalesce_key)
+            return task
+
+    def size(self) -> int:
+        """
+        Get the number of tasks waiting in the queue.
+        
+        Returns:
+            int: Count of queued tasks
+        """
+        with self._condition:
+            return len(self._queue)
+
+    def ready_size(self) -> int:
+        """
+        Get the number of queued tasks whose pull request is not in progress.
+        
+        Returns:
+            int: Count of tasks ready to be dequeued
+        """
+        with self._condition:
+            return len([task for task in self._queue if task.coalesce_key not in self._in_progress])
+
+    def acknowledge(self, task) -> None:
+        """
+        Mark a dequeued task as processed, allowing a follow-up review of the same pull request.
+        
+        Args:
+            task (object): The task object returned by `dequeue`
+        """
+        self.__complete(task)
+
+    def release(self, task) -> None:
+        """
+        Mark a dequeued task as failed. The in-memory queue does not retry tasks.
+        
+        Args:
+            task (object): The task object returned by `dequeue`
+        """
+        self.__complete(task)
+
+    def __complete(self, task) -> None:
+        """
+        Remove the task from the in progress set and wake up consumers waiting for its follow-up.
+        """
+        with self._condition:
+            self._in_progress.discard(task.coalesce_key)
+            self._condition.notify_all()
+
+    def __find_ready_task(self):
+        """
+        Find the oldest task whose pull request is not in progress. Must be called under the queue condition.
+        
+        Returns:
+            int: Index of the task in the queue, or None if no task is ready
+        """
+        for index, task in enumerate(self._queue):
+            if task.coalesce_key not in self._in_progress:
+                return index
+        return None
@@ -0,0 +1,293 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import asdict, fields
+from typing import Optional
+
+from configuration.queue_configuration import QueueConfiguration
+from contracts.review_task import ReviewTask
+from services.queue.task_queue import TaskQueue
+
+class SqliteTaskQueue(TaskQueue):
+    """
+    A durable task queue stored in a local SQLite database.
+
+    Tasks survive restarts of the service and are delivered at least once:
+    a dequeued task is leased for `lease_timeout` seconds and becomes visible again
+    when it is released or when the lease expires without acknowledgement.
+    Leases of tasks in progress are renewed by a background thread, so a long review keeps its lease;
+    leases left by a previous process are recovered on startup. Every lease has its own generation
+    (the attempt number), and a worker whose lease was lost can't acknowledge, release or renew it.
+    Requests for a pull request which is already queued are merged into the queued task,
+    and a pull request is never leased to two workers at the same time.
+    Acknowledgements are committed in batches (together with the next lease, or by the background thread),
+    because a lost acknowledgement only leads to one more delivery of an already processed task.
+
+    Attributes:
+        configuration (QueueConfiguration): Queue settings (database path, leases, retries)
+        _connection (sqlite3.Connection): Connection shared by all threads, guarded by `_condition`
+        _condition (threading.Condition): Condition for thread-safe operations and waking up waiting consumers
+        _leases (dict): Dequeued tasks by object id, mapped to their row id and attempt number
+        _pending_acks (list[int]): Row ids of acknowledged tasks not yet deleted from the database
+        logger (logging.Logger): Logger instance for queue operations
+    """
+    PENDING: str = "pending"
+    LEASED: str = "leased"
+    RECHECK_INTERVAL: int = 5 # Wake up periodically to pick up tasks with expired leases or retry delays
+    FLUSH_INTERVAL: int = 5 # Acknowledgements are committed by the background thread at least this often
+
+    def __init__(self, configuration: QueueConfiguration):
+        """
+        Open (or create) the queue database and recover tasks leased by a previous process.
+
+        Args:
+            configuration (QueueConfiguration): Queue settings
+        """
+        self.configuration = configuration
+        self.logger = logging.getLogger(SqliteTaskQueue.__name__)
+        self._condition = threading.Condition()
+        self._leases: dict[int, tuple[int, int, ReviewTask]] = {}
+        self._pending_acks: list[int] = []
+        directory = os.path.dirname(configuration.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(configuration.path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                payload TEXT NOT NULL,
+                coalesce_key TEXT NOT NULL DEFAULT '',
+                state TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                available_at REAL NOT NULL
+            )""")
+        if "coalesce_key" not in [column[1] for column in self._connection.execute("PRAGMA table_info(tasks)")]:
+            self._connection.execute("ALTER TABLE tasks ADD COLUMN coalesce_key TEXT NOT NULL DEFAULT ''")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS tasks_available_at ON tasks (available_at)")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS tasks_coalesce_key ON tasks (coalesce_key, state)")
+        recovered = self._connection.execute("UPDATE tasks SET state = ?, available_at = ? WHERE state = ?",
+                                             (self.PENDING, time.time(), self.LEASED)).rowcount
+        if recovered > 0:
+            self.logger.warning("Recovered %s tasks leased before restart", recovered)
+        threading.Thread(target=self.__maintain_leases, name="QueueLeases", daemon=True).start()
+
+    def enqueue(self, task: ReviewTask):
+        """
+        Persist a task and wake up one waiting consumer.
+        If a task for the same pull request is already queued, the new one is merged into it.
+
+        Args:
+            task (ReviewTask): The task to be added to the queue
+        """
+        with self._condition:
+            row = self._connection.execute("SELECT id, payload FROM tasks WHERE coalesce_key = ? AND state = ? ORDER BY id DESC LIMIT 1",
+                                           (task.coalesce_key, self.PENDING)).fetchone()
+            if row is not None:
+                queued_task = self.__deserialize(row[1])
+                queued_task.merge(task)
+                self._connection.execute("UPDATE tasks SET payload = ? WHERE id = ?", (json.dumps(asdict(queued_task)), row[0]))
+                self.logger.debug("Task merged into queued %s", task.coalesce_key)
+                return
+            self._connection.execute("INSERT INTO tasks (payload, coalesce_key, state, available_at) VALUES (?, ?, ?, ?)",
+                                     (json.dumps(asdict(task)), task.coalesce_key, self.PENDING, time.time()))
+            self.logger.debug("Task enqueued %s", task.__class__.__name__)
+            self._condition.notify()
+
+    def dequeue(self, timeout: Optional[float] = 0) -> ReviewTask:
+        """
+        Lease and return the next available task.
+        Tasks for pull requests which are in progress wait until the running review completes.
+
+        Args:
+            timeout (Optional[float]): Seconds to wait for a task when the queue is empty.
+                `0` returns immediately, `None` waits until a task is enqueued
+
+        Returns:
+            ReviewTask: The next task in the queue, or None if no task arrived within the timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while True:
+                task = self.__lease_next()
+                if task is not None:
+                    return task
+                wait = self.RECHECK_INTERVAL if deadline is None else min(self.RECHECK_INTERVAL, deadline - time.monotonic())
+                if wait <= 0:
+                    self.logger.debug("Queue is empty")
+                    return None
+                self._condition.wait(wait)
+
+    def size(self) -> int:
+        """
+        Get the number of tasks waiting in the queue.
+
+        Returns:
+            int: Count of queued tasks
+        """
+        with self._condition:
+            return self._connection.execute("SELECT COUNT(*) FROM tasks WHERE state = ?", (self.PENDING,)).fetchone()[0]
+
+    def ready_size(self) -> int:
+        """
+        Get the number of tasks available for a lease: retries whose delay has passed and tasks
+        whose pull request is not in progress.
+
+        Returns:
+            int: Count of tasks ready to be dequeued
+        """
+        with self._condition:
+            now = time.time()
+            return self._connection.execute("""
+                SELECT COUNT(*) FROM tasks
+                WHERE available_at <= :now
+                  AND id NOT IN (SELECT value FROM json_each(:acknowledged))
+                  AND coalesce_key NOT IN (SELECT coalesce_key FROM tasks WHERE state = :leased AND available_at > :now
+                                           AND id NOT IN (SELECT value FROM json_each(:acknowledged)))""",
+                {"now": now, "leased": self.LEASED, "acknowledged": json.dumps(self._pending_acks)}).fetchone()[0]
+
+    def acknowledge(self, task: ReviewTask) -> None:
+        """
+        Mark a dequeued task as processed. The task is deleted with the next batch commit.
+
+        Args:
+            task (ReviewTask): The task object returned by `dequeue`
+        """
+        with self._condition:
+            lease = self._leases.pop(id(task), None)
+            if lease is None or not self.__is_held(lease):
+                return
+            self._pending_acks.append(lease[0])
+            if len(self._pending_acks) >= self.configuration.ack_batch_size:
+                self.__flush_acks()
+            self._condition.notify_all()
+
+    def release(self, task: ReviewTask) -> None:
+        """
+        Return a failed task to the queue. It is redelivered after `retry_delay` seconds.
+        A request for the same pull request queued meanwhile is merged into the failed task,
+        so the pull request is reviewed once.
+
+        Args:
+            task (ReviewTask): The task object returned by `dequeue`
+        """
+        with self._condition:
+            lease = self._leases.pop(id(task), None)
+            if lease is None or not self.__is_held(lease):
+                return
+            row_id = lease[0]
+            follow_ups = self._connection.execute("SELECT id, payload FROM tasks WHERE coalesce_key = ? AND state = ? AND id != ?",
+                                                  (task.coalesce_key, self.PENDING, row_id)).fetchall()
+            for _, follow_up_payload in follow_ups:
+                task.merge(self.__deserialize(follow_up_payload))
+            if follow_ups:
+                self.logger.debug("Queued task merged into released %s", task.coalesce_key)
+            self._connection.execute("BEGIN")
+            self._connection.executemany("DELETE FROM tasks WHERE id = ?", [(follow_up_id,) for follow_up_id, _ in follow_ups])
+            self._connection.execute("UPDATE tasks SET state = ?, payload = ?, available_at = ? WHERE id = ?",
+                                     (self.PENDING, json.dumps(asdict(task)), time.time() + self.configuration.retry_delay, row_id))
+            self._connection.execute("COMMIT")
+            self._condition.notify_all()
+
+    def __lease_next(self) -> ReviewTask:
+        """
+        Lease the oldest available task. Must be called under the queue condition.
+        Tasks which exceeded `max_attempts` are dropped. Pending acknowledgements are committed with the lease.
+
+        Returns:
+            ReviewTask: Leased task or None if nothing is available
+        """
+        while True:
+            now = time.time()
+            # Acknowledged rows are not deleted yet: they are neither available nor in progress
+            row = self._connection.execute("""
+                SELECT id, payload, attempts FROM tasks
+                WHERE available_at <= :now
+                  AND id NOT IN (SELECT value FROM json_each(:acknowledged))
+                  AND coalesce_key NOT IN (SELECT coalesce_key FROM tasks WHERE state = :leased AND available_at > :now
+                                           AND id NOT IN (SELECT value FROM json_each(:acknowledged)))
+                ORDER BY available_at, id LIMIT 1""", {"now": now, "leased": self.LEASED, "acknowledged": json.dumps(self._pending_acks)}).fetchone()
+            if row is None:
+                return None
+            row_id, payload, attempts = row
+            if attempts >= self.configuration.max_attempts:
+                self.logger.error("Task %s dropped after %s attempts: %s", row_id, attempts, payload)
+                self._connection.execute("DELETE FROM tasks WHERE id = ?", (row_id,))
+                continue
+            self._connection.execute("BEGIN")
+            self.__delete_acknowledged()
+            self._connection.execute("UPDATE tasks SET state = ?, attempts = attempts + 1, available_at = ? WHERE id = ?",
+                                     (self.LEASED, now + self.configuration.lease_timeout, row_id))
+            self._connection.execute("COMMIT")
+            task = self.__deserialize(payload)
+            self._leases[id(task)] = (row_id, attempts + 1, task)
+            return task
+
+    def __is_held(self, lease: tuple[int, int, ReviewTask]) -> bool:
+        """
+        Check whether a lease of this queue was not lost (expired and given to another consumer).
+        Must be called under the queue condition.
+
+        Args:
+            lease (tuple[int, int, ReviewTask]): Row id, attempt number and task of the lease
+
+        Returns:
+            bool: True if the row is still leased with the same attempt number
+        """
+        held = self._connection.execute("SELECT 1 FROM tasks WHERE id = ? AND state = ? AND attempts = ?",
+                                        (lease[0], self.LEASED, lease[1])).fetchone() is not None
+        if not held:
+            self.logger.warning("Lease of task %s was lost (attempt %s). Ignore its result", lease[0], lease[1])
+        return held
+
+    def __maintain_leases(self) -> None:
+        """
+        Background loop committing acknowledgements and renewing leases of tasks in progress.
+        Leases are renewed when a third of `lease_timeout` is left.
+        """
+        while True:
+            time.sleep(min(self.FLUSH_INTERVAL, max(self.configuration.lease_timeout / 3, 1)))
+            try:
+                with self._condition:
+                    self.__flush_acks()
+                    now = time.time()
+                    self._connection.executemany("UPDATE tasks SET available_at = ? WHERE id = ? AND attempts = ? AND state = ? AND available_at < ?",
+                                                 [(now + self.configuration.lease_timeout, row_id, attempt, self.LEASED, now + self.configuration.lease_timeout / 3)
+                                                  for row_id, attempt, _ in self._leases.values()])
+            except Exception as e:
+                self.logger.error("Error maintaining queue leases: %s", e, exc_info=True)
+
+    def __flush_acks(self) -> None:
+        """
+        Delete acknowledged tasks in one transaction. Must be called under the queue condition.
+        """
+        if not self._pending_acks:
+            return
+        self._connection.execute("BEGIN")
+        self.__delete_acknowledged()
+        self._connection.execute("COMMIT")
+
+    def __delete_acknowledged(self) -> None:
+        """
+        Delete acknowledged tasks in the current transaction. Must be called under the queue condition.
+        """
+        self._connection.executemany("DELETE FROM tasks WHERE id = ?", [(row_id,) for row_id in self._pending_acks])
+        self._pending_acks.clear()
+
+    @staticmethod
+    def __deserialize(payload: str) -> ReviewTask:
+        """
+        Restore a task from its stored JSON payload.
+
+        Args:
+            payload (str): JSON payload of the task
+
+        Returns:
+            ReviewTask: Restored task
+        """
+        task_fields = {f.name for f in fields(ReviewTask)}
+        return ReviewTask(**{k: v for k, v in json.loads(payload).items() if k in task_fields})
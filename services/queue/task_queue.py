@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from typing import Optional
 
 class TaskQueue(ABC):
     """
@@ -6,6 +7,7 @@ class TaskQueue(ABC):
     
     This class defines the contract for task queue implementations,
     requiring them to provide enqueue and dequeue operations.
+    Consumers confirm processing of each dequeued task with `acknowledge` or `release`.
     """
     @abstractmethod
     def enqueue(self, task : object) -> None:
@@ -16,10 +18,50 @@ class TaskQueue(ABC):
             task (object): The task object to be added to the queue
         """
     @abstractmethod
-    def dequeue(self) -> object:
+    def dequeue(self, timeout: Optional[float] = 0) -> object:
         """
         Remove and return a task from the queue.
         
+        Args:
+            timeout (Optional[float]): Seconds to wait for a task when the queue is empty.
+                `0` returns immediately, `None` waits until a task is enqueued
+        
+        Returns:
+            object: The next task in the queue, or None if no task arrived within the timeout
+        """
+    @abstractmethod
+    def size(self) -> int:
+        """
+        Get the number of tasks waiting in the queue.
+        
+        Returns:
+            int: Count of queued tasks
+        """
+
+    def ready_size(self) -> int:
+        """
+        Get the number of queued tasks a worker could take right now.
+        Queues holding back tasks (e.g. follow-ups of a pull request in progress or delayed retries) exclude them.
+        
         Returns:
-            object: The next task in the queue
+            int: Count of tasks ready to be dequeued
+        """
+        return self.size()
+
+    def acknowledge(self, task : object) -> None:
+        """
+        Mark a dequeued task as successfully processed.
+        Queues without delivery guarantees may ignore this call.
+        
+        Args:
+            task (object): The task object returned by `dequeue`
+        """
+
+    def release(self, task : object) -> None:
+        """
+        Return a dequeued task whose processing failed.
+        Durable queues schedule it for redelivery, others may drop it.
+        
+        Args:
+            task (object): The task object returned by `dequeue`
         """
@@ -0,0 +1,175 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+
+from configuration.history_configuration import HistoryConfiguration
+from utils.diff_index import DiffFile, DiffIndex
+from utils.diff_utils import get_diff_fingerprint
+
+@dataclass
+class ReviewRecord:
+    """
+    Completed review of a pull request.
+
+    Attributes:
+        head_sha (str): Head commit SHA of the reviewed pull request
+        fingerprints (list[str]): Fingerprints of the reviewed file blocks of the diff
+        reviewed_at (float): Unix time of the review
+    """
+    head_sha: str
+    fingerprints: list[str]
+    reviewed_at: float
+
+class ReviewHistoryService:
+    """
+    Service storing completed reviews, used for incremental re-review of pull requests.
+
+    For each pull request it stores the head commit SHA and fingerprints of the diff file blocks
+    of the last completed review. Later reviews send only file blocks whose fingerprint is not known.
+    Per file review findings are stored by patch id of the file block (see `get_patch_id`),
+    so identical changes in other pull requests or after a rebase reuse them. Findings are kept
+    for `findings_ttl_hours` (the oldest are deleted above `max_findings`).
+
+    Attributes:
+        configuration (HistoryConfiguration): History settings
+        logger (logging.Logger): Logger instance for service operations
+    """
+    def __init__(self, configuration: HistoryConfiguration):
+        """
+        Initialize the service and open (or create) the history database if history is enabled.
+
+        Args:
+            configuration (HistoryConfiguration): History settings
+        """
+        self.configuration = configuration
+        self.logger = logging.getLogger(ReviewHistoryService.__name__)
+        self._lock = threading.Lock()
+        self._connection = None
+        self._findings_ttl = configuration.findings_ttl_hours * 60 * 60
+        if not configuration.enabled:
+            return
+        directory = os.path.dirname(configuration.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(configuration.path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS reviews (
+                pr_key TEXT PRIMARY KEY,
+                head_sha TEXT,
+                fingerprints TEXT NOT NULL,
+                reviewed_at REAL NOT NULL
+            )""")
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS findings (
+                patch_id TEXT PRIMARY KEY,
+                findings TEXT NOT NULL,
+                reviewed_at REAL NOT NULL
+            )""")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS findings_reviewed_at ON findings (reviewed_at)")
+        self.__prune_findings()
+
+    @property
+    def is_enabled(self) -> bool:
+        """Returns whether review history is enabled.
+
+        Returns:
+            bool: True if history is stored, False otherwise
+        """
+        return self._connection is not None
+
+    def get_last_review(self, pr_key: str) -> ReviewRecord:
+        """
+        Get the last completed review of a pull request.
+
+        Args:
+            pr_key (str): Pull request key (see `ReviewTask.coalesce_key`)
+
+        Returns:
+            ReviewRecord: Last review, or None if the pull request was not reviewed yet
+        """
+        if not self.is_enabled:
+            return None
+        with self._lock:
+            row = self._connection.execute("SELECT head_sha, fingerprints, reviewed_at FROM reviews WHERE pr_key = ?", (pr_key,)).fetchone()
+        if row is None:
+            return None
+        return ReviewRecord(row[0], json.loads(row[1]), row[2])
+
+    def get_changed_files(self, last_review: ReviewRecord, diff_index: DiffIndex) -> list[DiffFile]:
+        """
+        Get the files of the diff whose blocks were not reviewed in the last review.
+
+        Args:
+            last_review (ReviewRecord): Last completed review of the pull request
+            diff_index (DiffIndex): Index of the full git diff of the pull request
+
+        Returns:
+            list[DiffFile]: Changed files of the index in diff order (empty if nothing changed)
+        """
+        reviewed = set(last_review.fingerprints)
+        changed_files = [diff_file for diff_file in diff_index.files if get_diff_fingerprint(diff_index, diff_file) not in reviewed]
+        self.logger.info("Incremental review: %s of %s files changed since last review", len(changed_files), len(diff_index.files))
+        return changed_files
+
+    def record_review(self, pr_key: str, head_sha: str, diff_index: DiffIndex, files: list[DiffFile] = None) -> None:
+        """
+        Store a completed review of a pull request.
+
+        Args:
+            pr_key (str): Pull request key (see `ReviewTask.coalesce_key`)
+            head_sha (str): Head commit SHA of the reviewed pull request
+            diff_index (DiffIndex): Index of the full git diff of the pull request
+            files (list[DiffFile], optional): Reviewed files of the index (all files by default).
+                Files left out are sent again by the next incremental review
+        """
+        if not self.is_enabled:
+            return
+        fingerprints = [get_diff_fingerprint(diff_index, diff_file) for diff_file in (diff_index.files if files is None else files)]
+        with self._lock:
+            self._connection.execute("INSERT OR REPLACE INTO reviews (pr_key, head_sha, fingerprints, reviewed_at) VALUES (?, ?, ?, ?)",
+                                     (pr_key, head_sha, json.dumps(fingerprints), time.time()))
+
+    def get_findings(self, patch_id: str) -> list[dict]:
+        """
+        Get per file review findings stored for a file block.
+
+        Args:
+            patch_id (str): Patch id of the file block
+
+        Returns:
+            list[dict]: Findings (may be empty if nothing was found), or None if the block was not reviewed yet
+        """
+        if not self.is_enabled:
+            return None
+        with self._lock:
+            row = self._connection.execute("SELECT findings FROM findings WHERE patch_id = ? AND reviewed_at >= ?",
+                                           (patch_id, time.time() - self._findings_ttl)).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def record_findings(self, patch_id: str, findings: list[dict]) -> None:
+        """
+        Store per file review findings of a file block.
+
+        Args:
+            patch_id (str): Patch id of the file block
+            findings (list[dict]): Findings anchored to the changed lines of the block
+        """
+        if not self.is_enabled:
+            return
+        with self._lock:
+            self._connection.execute("INSERT OR REPLACE INTO findings (patch_id, findings, reviewed_at) VALUES (?, ?, ?)",
+                                     (patch_id, json.dumps(findings, ensure_ascii=False), time.time()))
+            self.__prune_findings()
+
+    def __prune_findings(self) -> None:
+        """
+        Delete expired findings and the oldest ones above `max_findings`.
+        """
+        self._connection.execute("DELETE FROM findings WHERE reviewed_at < ?", (time.time() - self._findings_ttl,))
+        self._connection.execute("DELETE FROM findings WHERE patch_id IN (SELECT patch_id FROM findings ORDER BY reviewed_at DESC LIMIT -1 OFFSET ?)",
+                                 (self.configuration.max_findings,))
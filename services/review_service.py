@@ -1,14 +1,22 @@
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
 from dataclasses import fields
 import json
 import logging
 
 from contracts.per_file_review_result import PerFileReviewResult
+from contracts.review_batch import ReviewBatch
 from services.ai.ai_client import AIClient
 from configuration.review_configuration import ReviewConfiguration, Language
 from configuration.llm_configuration import LLMConfiguration
+from services.metrics_service import MetricsService
+from services.review_history_service import ReviewHistoryService
+from services.tracing_service import TracingService
 
-from utils.diff_utils import split_diff, get_files_from_diff, get_changed_lines, annotate_diff_with_line_numbers
+from utils.diff_index import DiffFile, DiffIndex
+from utils.diff_utils import DiffChunk, pack_diff, get_patch_id
 from utils.text_utils import extract_json_blocks
+from utils.token_utils import TokenEstimator, estimate_tokens
 
 class ReviewService:
     """
@@ -21,9 +29,18 @@ class ReviewService:
         configuration (ReviewConfiguration): Configuration for review settings
         llm_configuration (LLMConfiguration): Configuration for the language model
         ai_client (AIClient): The AI client used for generating reviews
+        review_history_service (ReviewHistoryService): Store of per file findings, reused for already reviewed changes
+        executor (ThreadPoolExecutor): Executor bounding parallel requests to the language model
+        metrics (MetricsService): Collector of split and language model durations and chunk counts
+        tracing (TracingService): Writer of spans of diff stages and language model requests
+        token_estimator (TokenEstimator): Function estimating tokens of prompts, used to size diff chunks
         logger (logging.Logger): Logger instance for service operations
     """
-    def __init__(self, configuration: ReviewConfiguration, llm_configuration: LLMConfiguration, ai_client : AIClient):
+    MIN_DIFF_TOKENS: int = 512
+
+    def __init__(self, configuration: ReviewConfiguration, llm_configuration: LLMConfiguration, ai_client : AIClient,
+                review_history_service: ReviewHistoryService, metrics: MetricsService, tracing: TracingService,
+                token_estimator: TokenEstimator = estimate_tokens):
         """
         Initialize the ReviewService with configurations and AI client.
         
@@ -31,10 +48,19 @@ class ReviewService:
             configuration (ReviewConfiguration): Configuration for review settings
             llm_configuration (LLMConfiguration): Configuration for the language model
             ai_client (AIClient): The AI client to use for generating reviews
+            review_history_service (ReviewHistoryService): Store of per file findings
+            metrics (MetricsService): Collector of review metrics
+            tracing (TracingService): Writer of review traces
+            token_estimator (TokenEstimator, optional): Function estimating tokens of prompts
         """
         self.configuration = configuration
         self.llm_configuration = llm_configuration
         self.ai_client = ai_client
+        self.review_history_service = review_history_service
+        self.executor = ThreadPoolExecutor(max_workers=llm_configuration.max_parallel_requests, thread_name_prefix="LLM")
+        self.metrics = metrics
+        self.tracing = tracing
+        self.token_estimator = token_estimator
         self.logger = logging.getLogger(ReviewService.__name__)
         self.system_prompt = {
             "role":"system", 
@@ -59,70 +85,243 @@ class ReviewService:
         """
         return self.configuration.review_as_conversations
 
-    def review_pull_request(self, diff: str, user_message: str = None) -> list[str]:
+    @property
+    def ignore_files(self) -> list[str]:
+        """Returns file names excluded from review.
+        
+        Returns:
+            list[str]: Ignored file names (a file is ignored if its path contains one of them)
+        """
+        return self.configuration.ignore_files
+
+    def review_pull_request(self, diff_index: DiffIndex, user_message: str = None, files: list[DiffFile] = None) -> ReviewBatch:
         """
         Perform a code review on a pull request diff.
         
         Args:
-            diff (str): The git diff content to review
+            diff_index (DiffIndex): Index of the git diff to review
             user_message (str, optional): Additional instructions from the user
+            files (list[DiffFile], optional): Files of the index to review (all files by default)
             
         Returns:
-            list[str]: List of review results, one for each diff chunk
+            ReviewBatch: Review results (one for each diff chunk) and paths of files whose chunk failed
         """
         results = []
-        splited_diff = split_diff(diff, 12000, self.configuration.ignore_files)
-        self.logger.info("Received diff (len = %s) for automatic review. Split to %s diffs", len(diff), len(splited_diff))
-        for diff_slice in splited_diff:
-            file_names = "\n* ".join(get_files_from_diff(diff_slice))
-            prompt = self.__en_prompt(diff_slice, user_message) if self.configuration.language == Language.EN else self.__ru_prompt(diff_slice, user_message)
-            review_result = self.ai_client.completions([self.system_prompt, {"role":"user","content":prompt}], self.llm_configuration.model)
+        failed_paths = []
+        empty_prompt = self.__en_prompt("", user_message) if self.configuration.language == Language.EN else self.__ru_prompt("", user_message)
+        with self.metrics.stage("split", "diff"), self.tracing.span("pack_diff", "diff"):
+            splited_diff, report = pack_diff(diff_index, self.__token_budget(empty_prompt), self.configuration.ignore_files, self.token_estimator,
+                                             self.configuration.overlap_hunks, files=files)
+        self.metrics.observe("review_chunks", len(splited_diff), {"mode": "comments"}, MetricsService.CHUNK_BUCKETS)
+        self.logger.info("Received diff (len = %s) for automatic review. Split to %s diffs (%s files, %s tokens, budget %s, fill ratio %.2f)",
+                         len(diff_index.text), len(splited_diff), report.blocks, report.total_tokens, report.token_budget, report.fill_ratio)
+        prompts = [self.__en_prompt(diff_slice.text, user_message) if self.configuration.language == Language.EN else self.__ru_prompt(diff_slice.text, user_message)
+                   for diff_slice in splited_diff]
+        for diff_slice, review_result in zip(splited_diff, self.__completions(prompts)):
+            if review_result is None:
+                failed_paths.extend(self.__paths(diff_slice))
+                continue
+            file_names = "\n* ".join(diff_slice.names)
             results.append(f"🤖 AI Code Review:\n\nFiles: \n* {file_names}\n\n{review_result}")
-        return results
+        return ReviewBatch(results, list(dict.fromkeys(failed_paths)))
 
-    def per_file_review_pull_request(self, diff: str) -> list[PerFileReviewResult]:
+    def per_file_review_pull_request(self, diff_index: DiffIndex, files: list[DiffFile] = None, full_review: bool = False) -> ReviewBatch:
         """
         Perform a per file code review on a pull request diff.
         
         Args:
-            diff (str): The git diff content to review
+            diff_index (DiffIndex): Index of the git diff to review
+            files (list[DiffFile], optional): Files of the index to review (all files by default)
+            full_review (bool, optional): Review every file again instead of reusing stored findings
             
         Returns:
-            list[dict]: List of review results, one for each diff chunk
+            ReviewBatch: Per file review results and paths of files whose chunk failed
         """
         results = []
-        changed_lines = get_changed_lines(diff)
-        splited_diff = split_diff(annotate_diff_with_line_numbers(diff), 12000, self.configuration.ignore_files)
-        self.logger.info("Received diff (len = %s) for automatic per file review. Split to %s diffs", len(diff), len(splited_diff))
-        for diff_slice in splited_diff:
-            prompt = self.__en_per_file_prompt(diff_slice) if self.configuration.language == Language.EN else self.__ru_per_file_prompt(diff_slice)
-            review_result = self.ai_client.completions([self.system_prompt, {"role":"user","content":prompt}], self.llm_configuration.model)
+        failed_paths = []
+        # Splitting, annotation and line lookups work on offsets into the indexed diff
+        changed_lines = diff_index.changed_lines()
+        # Changes reviewed before (e.g. before a rebase or in another branch) reuse stored findings, unless a full review is requested
+        new_files = []
+        new_patch_ids = {}
+        for diff_file in diff_index.files if files is None else files:
+            path = diff_file.path
+            patch_id = get_patch_id(diff_index, diff_file)
+            findings = self.review_history_service.get_findings(patch_id) if path is not None and not full_review else None
+            if findings is None:
+                new_files.append(diff_file)
+                new_patch_ids[path] = patch_id
+                continue
+            self.logger.info("File %s already reviewed. Reuse %s findings", path, len(findings))
+            results.extend(self.__restore_findings(findings, path, changed_lines.get(path)))
+        empty_prompt = self.__en_per_file_prompt("") if self.configuration.language == Language.EN else self.__ru_per_file_prompt("")
+        # Oversized files are split at hunk boundaries, and every piece is annotated with the line numbers of the full diff
+        with self.metrics.stage("split", "diff"), self.tracing.span("pack_diff", "diff", annotate=True):
+            splited_diff, report = pack_diff(diff_index, self.__token_budget(empty_prompt), self.configuration.ignore_files, self.token_estimator,
+                                             self.configuration.overlap_hunks, annotate=True, files=new_files)
+        self.metrics.observe("review_chunks", len(splited_diff), {"mode": "per_file"}, MetricsService.CHUNK_BUCKETS)
+        self.logger.info("Received diff (len = %s) for automatic per file review. Split to %s diffs (%s files, %s tokens, budget %s, fill ratio %.2f)",
+                         len(diff_index.text), len(splited_diff), report.blocks, report.total_tokens, report.token_budget, report.fill_ratio)
+        prompts = [self.__en_per_file_prompt(diff_slice.text) if self.configuration.language == Language.EN else self.__ru_per_file_prompt(diff_slice.text)
+                   for diff_slice in splited_diff]
+        new_results = []
+        for diff_slice, review_result in zip(splited_diff, self.__completions(prompts)):
+            if review_result is None:
+                failed_paths.extend(self.__paths(diff_slice))
+                continue
             json_in_result = extract_json_blocks(review_result)
             if len(json_in_result) == 0:
                 self.logger.warning("Json not found in per file review!\n%s", review_result)
+                failed_paths.extend(self.__paths(diff_slice))
                 continue
-            for result in json.loads(json_in_result[0]):
+            try:
+                chunk_results = json.loads(json_in_result[0])
+            except ValueError:
+                self.logger.warning("Invalid json in per file review!\n%s", review_result)
+                failed_paths.extend(self.__paths(diff_slice))
+                continue
+            for result in chunk_results if isinstance(chunk_results, list) else []:
                 if not isinstance(result, dict):
                     continue
                 review_result_fields = {f.name for f in fields(PerFileReviewResult)}
                 per_file_result = PerFileReviewResult(**{k: v for k, v in result.items() if k in review_result_fields})
-                changed_lines_in_file : list[int] = changed_lines.get(per_file_result.path)
-                if changed_lines_in_file is None:
+                # The model may answer with a/ or b/ prefixes or the old name of a renamed file
+                path = diff_index.resolve_path(per_file_result.path)
+                if path is None:
+                    continue
+                per_file_result.path = path
+                try:
+                    line = int(per_file_result.line)
+                except (TypeError, ValueError):
                     continue
-                added_lines = changed_lines_in_file.get("added")
-                removed_lines = changed_lines_in_file.get("removed")
-                candidates = []
-                if len(added_lines) > 0:
-                    candidates.append(min(added_lines, key=lambda x: abs(x - (per_file_result.line))))
-                if len(removed_lines) > 0:
-                    candidates.append(min(removed_lines, key=lambda x: abs(x - (per_file_result.line))))
-                if len(candidates) > 0:
-                    per_file_result.line = min(candidates, key=lambda x: abs(x - (per_file_result.line)))
-                else:
+                changed_lines_in_file = changed_lines[path]
+                candidates = [nearest for nearest in (changed_lines_in_file["added"].nearest(line), changed_lines_in_file["removed"].nearest(line))
+                              if nearest is not None]
+                if len(candidates) == 0:
                     continue
-                results.append(per_file_result)
+                per_file_result.line = min(candidates, key=lambda x: abs(x - line))
+                new_results.append(per_file_result)
+        # A file split into several chunks is reviewed only if every chunk succeeded
+        reviewed_paths = {path for diff_slice in splited_diff for path in self.__paths(diff_slice)}.difference(failed_paths)
+        for path, patch_id in new_patch_ids.items():
+            if path in reviewed_paths:
+                self.review_history_service.record_findings(patch_id, self.__anchor_findings([r for r in new_results if r.path == path], changed_lines.get(path)))
+        results.extend(new_results)
+        return ReviewBatch(results, list(dict.fromkeys(failed_paths)))
+
+    @staticmethod
+    def __paths(diff_slice: DiffChunk) -> list[str]:
+        """
+        Get the paths of the files of a diff chunk.
+        
+        Args:
+            diff_slice (DiffChunk): Chunk of the diff
+            
+        Returns:
+            list[str]: Paths of the files after the change (see `DiffFile.path`)
+        """
+        return [diff_file.path for diff_file in diff_slice.files if diff_file.path is not None]
+
+    @staticmethod
+    def __anchor_findings(per_file_results: list[PerFileReviewResult], changed_lines_in_file: dict) -> list[dict]:
+        """
+        Convert findings of a file to positions in the list of its changed lines, independent of line offsets.
+        
+        Args:
+            per_file_results (list[PerFileReviewResult]): Findings of the file, snapped to changed lines
+            changed_lines_in_file (dict): Changed lines of the file (see `get_changed_lines`)
+            
+        Returns:
+            list[dict]: Findings with body, side (`added`/`removed`) and index of the changed line
+        """
+        findings = []
+        for per_file_result in per_file_results:
+            for side in ("added", "removed"):
+                if per_file_result.line in changed_lines_in_file[side]:
+                    findings.append({"body": per_file_result.body, "side": side, "index": changed_lines_in_file[side].index(per_file_result.line)})
+                    break
+        return findings
+
+    @staticmethod
+    def __restore_findings(findings: list[dict], path: str, changed_lines_in_file: dict) -> list[PerFileReviewResult]:
+        """
+        Re-anchor stored findings to the line numbers of the current diff.
+        
+        Args:
+            findings (list[dict]): Findings stored by `__anchor_findings`
+            path (str): Current path of the file
+            changed_lines_in_file (dict): Changed lines of the file in the current diff (see `get_changed_lines`)
+            
+        Returns:
+            list[PerFileReviewResult]: Findings with current line numbers
+        """
+        results = []
+        for finding in findings:
+            lines = changed_lines_in_file.get(finding["side"], [])
+            if finding["index"] < len(lines):
+                results.append(PerFileReviewResult(finding["body"], path, lines[finding["index"]]))
+        return results
+
+    def __token_budget(self, empty_prompt: str) -> int:
+        """
+        Calculate how many tokens of diff fit into one request to the language model.
+        
+        Args:
+            empty_prompt (str): The user prompt rendered without diff
+            
+        Returns:
+            int: Context window minus tokens reserved for the answer, the system prompt and the prompt template
+        """
+        overhead = self.token_estimator(self.system_prompt["content"]) + self.token_estimator(empty_prompt)
+        budget = self.llm_configuration.context_tokens - self.llm_configuration.response_tokens - overhead
+        return max(budget, self.MIN_DIFF_TOKENS)
+
+    def __completions(self, prompts: list[str]) -> list[str]:
+        """
+        Send prompts to the language model in parallel, bounded by `max_parallel_requests`.
+        A failed prompt does not stop the others; its result is None.
+        
+        Args:
+            prompts (list[str]): User prompts, one for each diff chunk
+            
+        Returns:
+            list[str]: Completions in the order of the prompts
+            
+        Raises:
+            Exception: The first error, if the completion failed for every prompt
+        """
+        # Prompts run in a copy of the caller context, so backend usage is attributed to the reviewed repository
+        futures = [self.executor.submit(contextvars.copy_context().run, self.__completion, prompt, index, len(prompts))
+                   for index, prompt in enumerate(prompts)]
+        results = []
+        errors = []
+        for index, future in enumerate(futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                self.logger.error("Error getting completion for diff chunk %s/%s: %s", index + 1, len(futures), e, exc_info=True)
+                results.append(None)
+                errors.append(e)
+        if len(errors) > 0 and len(errors) == len(futures):
+            raise errors[0]
         return results
 
+    def __completion(self, prompt: str, index: int, count: int) -> str:
+        """
+        Send one prompt to the language model, measuring the request.
+        
+        Args:
+            prompt (str): User prompt
+            index (int): Zero based index of the diff chunk
+            count (int): Count of diff chunks
+            
+        Returns:
+            str: Completion
+        """
+        span = self.tracing.span("completion", "llm", chunk=f"{index + 1}/{count}", model=self.llm_configuration.model, prompt_size=len(prompt))
+        with self.metrics.stage("llm", self.llm_configuration.type.value), span:
+            return self.ai_client.completions([self.system_prompt, {"role":"user","content":prompt}], self.llm_configuration.model)
+
     def __ru_prompt(self, diff: str, user_message: str) -> str:
         """
         Generate a Russian language prompt for the AI review.
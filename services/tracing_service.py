@@ -0,0 +1,156 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from configuration.tracing_configuration import TracingConfiguration
+
+class TracingService:
+    """
+    Lightweight tracing of reviews, written as Chrome trace events (loadable by Perfetto and chrome://tracing).
+
+    A trace id is created when a review is requested and carried by the review task. While the task is
+    processed the trace is kept in a context variable, so spans opened anywhere in the call (also in
+    executor threads running in a copy of the context) belong to it. Every trace is shown as a separate
+    process named by the pull request, with a track per thread.
+
+    Events are appended to `path`, one JSON object per line. The file starts with `[` and the array
+    is never closed, as the trace event format allows, so it can be opened while reviews are still written.
+
+    Attributes:
+        configuration (TracingConfiguration): Tracing settings
+        logger (logging.Logger): Logger instance for tracing operations
+    """
+    MAX_NAMED_THREADS: int = 10000
+    _trace_id: ContextVar[str] = ContextVar("trace_id", default=None)
+
+    def __init__(self, configuration: TracingConfiguration):
+        """
+        Initialize the service and open the trace file if tracing is enabled.
+
+        Args:
+            configuration (TracingConfiguration): Tracing settings
+        """
+        self.configuration = configuration
+        self.logger = logging.getLogger(TracingService.__name__)
+        self._lock = threading.Lock()
+        self._named_threads: set[tuple[int, int]] = set()
+        self._file = None
+        if not configuration.enabled:
+            return
+        directory = os.path.dirname(configuration.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(configuration.path, "a", encoding="utf-8")
+        if self._file.tell() == 0:
+            self._file.write("[\n")
+            self._file.flush()
+
+    @property
+    def is_enabled(self) -> bool:
+        """Returns whether traces are written.
+
+        Returns:
+            bool: True if tracing is enabled, False otherwise
+        """
+        return self._file is not None
+
+    @contextmanager
+    def trace(self, trace_id: str, name: str):
+        """
+        Make a trace current for the code run in the context.
+
+        Args:
+            trace_id (str): Trace id, may be None (nothing is traced)
+            name (str): Name of the trace shown by viewers (e.g. pull request url)
+        """
+        if not self.is_enabled or trace_id is None:
+            yield
+            return
+        token = self._trace_id.set(trace_id)
+        try:
+            self.__write({"name": "process_name", "ph": "M", "pid": self.__pid(trace_id), "args": {"name": name}})
+            yield
+        finally:
+            self._trace_id.reset(token)
+
+    @contextmanager
+    def span(self, name: str, category: str, trace_id: str = None, **args):
+        """
+        Record the duration of an operation in the current trace (or the given one).
+
+        Args:
+            name (str): Operation name
+            category (str): Category of the operation (`api`, `queue`, `git`, `llm`, `diff`, `review`)
+            trace_id (str, optional): Trace id, used when no trace is current (e.g. in the API)
+            **args: Values shown with the span
+        """
+        trace_id = trace_id or self._trace_id.get()
+        if not self.is_enabled or trace_id is None:
+            yield
+            return
+        started = time.time()
+        try:
+            yield
+        except Exception as e:
+            args["error"] = f"{e.__class__.__name__}: {e}"
+            raise
+        finally:
+            self.add_span(name, category, started, time.time(), trace_id, **args)
+
+    def add_span(self, name: str, category: str, started: float, finished: float, trace_id: str = None, **args) -> None:
+        """
+        Record an operation which was measured by the caller (e.g. waiting in the queue).
+
+        Args:
+            name (str): Operation name
+            category (str): Category of the operation
+            started (float): Unix time the operation started
+            finished (float): Unix time the operation finished
+            trace_id (str, optional): Trace id, the current trace if not given
+            **args: Values shown with the span
+        """
+        trace_id = trace_id or self._trace_id.get()
+        if not self.is_enabled or trace_id is None:
+            return
+        pid = self.__pid(trace_id)
+        thread = threading.current_thread()
+        event = {"name": name, "cat": category, "ph": "X", "ts": int(started * 1e6), "dur": max(int((finished - started) * 1e6), 0),
+                 "pid": pid, "tid": thread.native_id, "args": {"trace_id": trace_id, **args}}
+        with self._lock:
+            if (pid, thread.native_id) not in self._named_threads:
+                if len(self._named_threads) >= self.MAX_NAMED_THREADS:
+                    self._named_threads.clear()
+                self._named_threads.add((pid, thread.native_id))
+                self.__write({"name": "thread_name", "ph": "M", "pid": pid, "tid": thread.native_id, "args": {"name": thread.name}}, locked=True)
+            self.__write(event, locked=True)
+
+    def __write(self, event: dict, locked: bool = False) -> None:
+        """
+        Append one event to the trace file.
+
+        Args:
+            event (dict): Trace event
+            locked (bool): Whether the caller holds the lock
+        """
+        line = json.dumps(event, ensure_ascii=False, default=str) + ",\n"
+        try:
+            if locked:
+                self._file.write(line)
+                self._file.flush()
+                return
+            with self._lock:
+                self._file.write(line)
+                self._file.flush()
+        except OSError as e:
+            self.logger.warning("Error writing trace event: %s", e)
+
+    @staticmethod
+    def __pid(trace_id: str) -> int:
+        """
+        Map a trace id to the process id of its events, so every review is a separate process in viewers.
+        """
+        return int(trace_id[:7], 16)
@@ -0,0 +1,429 @@
+from dataclasses import dataclass, field
+from typing import Iterator, Optional
+import re
+
+from utils.line_ranges import LineRanges
+from utils.token_utils import TokenEstimator
+
+_FILE_HEADER_RE = re.compile(r'^diff --git a/(.*?) b/(.*?)\r?\n?$')
+_HUNK_HEADER_RE = re.compile(r'^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@(.*)', re.DOTALL)
+
+@dataclass
+class DiffHunk:
+    """
+    Hunk (`@@` section) of a file block, as offsets into the diff text.
+
+    Attributes:
+        start (int): Offset of the `@@` header line
+        body_start (int): Offset of the first line after the header
+        end (int): Offset after the last line of the hunk
+        old_start (int): First line number in the old file
+        new_start (int): First line number in the new file
+        section (str): Text after the closing `@@` of the header (function name etc.) without line break
+    """
+    start: int
+    body_start: int
+    end: int
+    old_start: int
+    new_start: int
+    section: str
+
+@dataclass
+class DiffFile:
+    """
+    File block (`diff --git` section) of a diff, as offsets into the diff text.
+
+    Attributes:
+        start (int): Offset of the `diff --git` line
+        hunks_start (int): Offset of the first hunk (end of the file header)
+        end (int): Offset after the last line of the block
+        old_path (str): Path of the file before the change
+        new_path (str): Path of the file after the change
+        rename_from (Optional[str]): Path from the `rename from` line
+        rename_to (Optional[str]): Path from the `rename to` line
+        hunks (list[DiffHunk]): Hunks of the block in diff order
+        added (LineRanges): Line numbers of added lines in the new file
+        removed (LineRanges): Line numbers of removed lines in the old file
+    """
+    start: int
+    hunks_start: int
+    end: int
+    old_path: str
+    new_path: str
+    rename_from: Optional[str] = None
+    rename_to: Optional[str] = None
+    hunks: list[DiffHunk] = field(default_factory=list)
+    added: LineRanges = field(default_factory=LineRanges)
+    removed: LineRanges = field(default_factory=LineRanges)
+
+    @property
+    def path(self) -> str:
+        """Returns the path of the file after the change.
+
+        Returns:
+            str: Path used by review comments
+        """
+        return self.new_path
+
+    @property
+    def names(self) -> list[str]:
+        """Returns all file names of the block (old and new path, rename source and target).
+
+        Returns:
+            list[str]: Unique file names in order of appearance
+        """
+        names = [self.old_path, self.new_path, self.rename_from, self.rename_to]
+        return list(dict.fromkeys(name for name in names if name is not None))
+
+class DiffIndex:
+    """
+    Structured index of a git diff, built in one pass over the text.
+
+    The index stores files, renames, hunks and changed line numbers with offsets into the original text,
+    so splitting, annotation and changed line lookups slice the text instead of parsing it again.
+
+    Attributes:
+        text (str): The indexed diff text
+        preamble_end (int): Offset of the first `diff --git` line (text before it belongs to no file)
+        files (list[DiffFile]): File blocks in diff order
+    """
+    def __init__(self, text: str):
+        """
+        Parse a git diff.
+
+        Args:
+            text (str): The git diff content to index
+        """
+        self.text = text or ""
+        self.preamble_end = len(self.text)
+        self.files: list[DiffFile] = []
+        self._paths: Optional[dict[str, str]] = None
+        self.__parse()
+
+    def block(self, diff_file: DiffFile) -> str:
+        """
+        Get the text of a file block.
+
+        Args:
+            diff_file (DiffFile): File of this index
+
+        Returns:
+            str: The file block as it appears in the diff
+        """
+        return self.text[diff_file.start:diff_file.end]
+
+    def blocks(self) -> list[str]:
+        """
+        Get the text of every file block. Text before the first file, if any, is returned as the first block.
+
+        Returns:
+            list[str]: File blocks in diff order
+        """
+        blocks = [self.text[:self.preamble_end]] if self.preamble_end > 0 else []
+        blocks.extend(self.block(diff_file) for diff_file in self.files)
+        return blocks
+
+    def names(self) -> list[str]:
+        """
+        Get all file names of the diff.
+
+        Returns:
+            list[str]: Unique file names in order of appearance
+        """
+        return list(dict.fromkeys(name for diff_file in self.files for name in diff_file.names))
+
+    def changed_lines(self) -> dict:
+        """
+        Get changed line numbers by file path (see `get_changed_lines`).
+
+        Returns:
+            dict: Dictionary where keys are file paths, values are dictionaries with `added` and `removed` line numbers (`LineRanges`)
+        """
+        changes = {}
+        for diff_file in self.files:
+            file_changes = changes.get(diff_file.path)
+            if file_changes is None:
+                changes[diff_file.path] = {'added': diff_file.added, 'removed': diff_file.removed}
+                continue
+            # The same path in several blocks: merge into new sets, the ones of the files stay unchanged
+            changes[diff_file.path] = file_changes = {side: LineRanges(list(lines)) for side, lines in file_changes.items()}
+            file_changes['added'].update(diff_file.added)
+            file_changes['removed'].update(diff_file.removed)
+        return changes
+
+    def resolve_path(self, path: str) -> Optional[str]:
+        """
+        Find the path of a file of the diff by a path given by a user or a language model.
+
+        Besides the exact path, `a/` and `b/` diff prefixes, `./` and `/` prefixes and old names
+        of renamed files are accepted.
+
+        Args:
+            path (str): Path to look up
+
+        Returns:
+            Optional[str]: Path of the file after the change (see `DiffFile.path`), or None if the diff has no such file
+        """
+        if not isinstance(path, str):
+            return None
+        if self._paths is None:
+            self._paths = {diff_file.path: diff_file.path for diff_file in self.files if diff_file.path is not None}
+            for diff_file in self.files:
+                for name in diff_file.names:
+                    self._paths.setdefault(name, diff_file.path)
+        path = path.strip()
+        candidates = [path]
+        stripped = path[2:] if path.startswith('./') else path.lstrip('/')
+        candidates.append(stripped)
+        if stripped[:2] in ('a/', 'b/'):
+            candidates.append(stripped[2:])
+        return next((self._paths[candidate] for candidate in candidates if candidate in self._paths), None)
+
+    def render(self, diff_file: DiffFile, annotate: bool = False) -> str:
+        """
+        Get the text of a file block, optionally annotated with line numbers.
+
+        Args:
+            diff_file (DiffFile): File of this index
+            annotate (bool): Prefix hunk lines with their line numbers (see `annotate_diff_with_line_numbers`)
+
+        Returns:
+            str: The file block
+        """
+        if not annotate:
+            return self.block(diff_file)
+        return self.text[diff_file.start:diff_file.hunks_start] + ''.join(self.render_hunk(hunk, True) for hunk in diff_file.hunks)
+
+    def render_hunk(self, hunk: DiffHunk, annotate: bool = False) -> str:
+        """
+        Get the text of a hunk, optionally annotated with line numbers.
+
+        Args:
+            hunk (DiffHunk): Hunk of this index
+            annotate (bool): Prefix lines with their line numbers
+
+        Returns:
+            str: The hunk with its header
+        """
+        if not annotate:
+            return self.text[hunk.start:hunk.end]
+        return self.text[hunk.start:hunk.body_start] + ''.join(_annotate_line(line, kind, number) for line, kind, number in self.walk(hunk))
+
+    def annotate(self) -> str:
+        """
+        Get the whole diff with hunk lines prefixed by their line numbers.
+
+        Returns:
+            str: Annotated diff text
+        """
+        return self.text[:self.preamble_end] + ''.join(self.render(diff_file, True) for diff_file in self.files)
+
+    def split_file(self, diff_file: DiffFile, max_size: int, estimator: TokenEstimator = len,
+                   overlap_hunks: int = 0, annotate: bool = False) -> list[tuple[str, int]]:
+        """
+        Split a file block larger than `max_size` into pieces at `@@` hunk boundaries (see `split_diff_block`).
+
+        Args:
+            diff_file (DiffFile): File of this index
+            max_size (int): Maximum size of a piece, measured by `estimator`
+            estimator (TokenEstimator): Function measuring a text (characters by default)
+            overlap_hunks (int): Count of trailing hunks of a piece repeated at the start of the next piece as context
+            annotate (bool): Prefix hunk lines with their line numbers
+
+        Returns:
+            list[tuple[str, int]]: Pieces of the block with their sizes (the block itself if it fits or has no hunks)
+        """
+        whole = self.render(diff_file, annotate)
+        whole_size = estimator(whole)
+        if whole_size <= max_size or not diff_file.hunks:
+            return [(whole, whole_size)]
+        header = self.text[diff_file.start:diff_file.hunks_start]
+        header_size = estimator(header)
+        hunk_budget = max(max_size - header_size, 1)
+        sized_hunks = []
+        for hunk in diff_file.hunks:
+            hunk_text = self.render_hunk(hunk, annotate)
+            hunk_size = estimator(hunk_text)
+            if hunk_size > hunk_budget:
+                sized_hunks.extend(self.__split_hunk(hunk, hunk_budget, estimator, annotate))
+            else:
+                sized_hunks.append((hunk_text, hunk_size))
+        pieces = []
+        current = []
+        current_size = 0
+        for hunk_text, size in sized_hunks:
+            if current and current_size + size > hunk_budget:
+                pieces.append((header + ''.join(h for h, _ in current), header_size + current_size))
+                current = current[-overlap_hunks:] if overlap_hunks > 0 else []
+                while current and sum(s for _, s in current) + size > hunk_budget:
+                    current.pop(0)
+                current_size = sum(s for _, s in current)
+            current.append((hunk_text, size))
+            current_size += size
+        if current:
+            pieces.append((header + ''.join(h for h, _ in current), header_size + current_size))
+        return pieces
+
+    def __split_hunk(self, hunk: DiffHunk, max_size: int, estimator: TokenEstimator, annotate: bool) -> list[tuple[str, int]]:
+        """
+        Split one hunk into consecutive smaller hunks with recalculated `@@` headers.
+
+        Args:
+            hunk (DiffHunk): Hunk of this index
+            max_size (int): Maximum size of a resulting hunk, measured by `estimator`
+            estimator (TokenEstimator): Function measuring a text
+            annotate (bool): Prefix lines with their line numbers
+
+        Returns:
+            list[tuple[str, int]]: Resulting hunks with their sizes
+        """
+        parts = []
+        body = []
+        body_size = 0
+        old_line, new_line = hunk.old_start, hunk.new_start
+        old_start, new_start, old_count, new_count = old_line, new_line, 0, 0
+
+        def flush():
+            part_header = f"@@ -{old_start},{old_count} +{new_start},{new_count} @@{hunk.section}\n"
+            parts.append((part_header + ''.join(body), estimator(part_header) + body_size))
+
+        for line, kind, number in self.walk(hunk):
+            text = _annotate_line(line, kind, number) if annotate else line
+            line_size = estimator(text)
+            # "\ No newline at end of file" belongs to the previous line
+            if body and body_size + line_size > max_size and kind != '\\':
+                flush()
+                body, body_size = [], 0
+                old_start, new_start, old_count, new_count = old_line, new_line, 0, 0
+            body.append(text)
+            body_size += line_size
+            if kind != '+' and kind != '\\':
+                old_line += 1
+                old_count += 1
+            if kind != '-' and kind != '\\':
+                new_line += 1
+                new_count += 1
+        if body:
+            flush()
+        return parts
+
+    def walk(self, hunk: DiffHunk) -> Iterator[tuple[str, str, int]]:
+        """
+        Iterate over the lines of a hunk body with their kind and line number.
+
+        Args:
+            hunk (DiffHunk): Hunk of this index
+
+        Yields:
+            tuple[str, str, int]: Line (with line break), kind (` `, `-`, `+` or `\\`) and line number
+                (new file for context and added lines, old file for removed lines)
+        """
+        old_line, new_line = hunk.old_start, hunk.new_start
+        for line in _iter_lines(self.text, hunk.body_start, hunk.end):
+            kind = line[0] if line[0] in '+-\\' else ' '
+            if kind == '-':
+                yield line, kind, old_line
+                old_line += 1
+            elif kind == '+':
+                yield line, kind, new_line
+                new_line += 1
+            elif kind == '\\':
+                yield line, kind, 0
+            else:
+                yield line, kind, new_line
+                old_line += 1
+                new_line += 1
+
+    def __parse(self) -> None:
+        """
+        Build the index in one pass over the diff text.
+        """
+        text = self.text
+        diff_file = None
+        hunk = None
+        old_line = new_line = 0
+        position = 0
+        for line in _iter_lines(text, 0, len(text)):
+            line_start = position
+            position += len(line)
+            if line.startswith('diff --git'):
+                if diff_file is None:
+                    self.preamble_end = line_start
+                else:
+                    self.__close(diff_file, hunk, line_start)
+                hunk = None
+                match = _FILE_HEADER_RE.match(line)
+                old_path, new_path = match.groups() if match else (None, None)
+                diff_file = DiffFile(line_start, line_start, line_start, old_path, new_path)
+                self.files.append(diff_file)
+                continue
+            if diff_file is None:
+                continue
+            if line.startswith('@@ '):
+                match = _HUNK_HEADER_RE.match(line)
+                if match:
+                    if hunk is None:
+                        diff_file.hunks_start = line_start
+                    else:
+                        hunk.end = line_start
+                    old_line = int(match.group(1))
+                    new_line = int(match.group(3))
+                    hunk = DiffHunk(line_start, position, position, old_line, new_line, match.group(5).rstrip('\r\n'))
+                    diff_file.hunks.append(hunk)
+                    continue
+            if hunk is None:
+                # File header: index, mode, rename and ---/+++ lines
+                if line.startswith('rename from '):
+                    diff_file.rename_from = line[len('rename from '):].rstrip('\r\n')
+                elif line.startswith('rename to '):
+                    diff_file.rename_to = line[len('rename to '):].rstrip('\r\n')
+                elif diff_file.new_path is None and (line.startswith('--- ') or line.startswith('+++ ')):
+                    # `diff --git` line without a/ and b/ prefixes (e.g. --no-prefix): take paths from the ---/+++ lines
+                    name = line[4:].rstrip('\r\n')
+                    if line[0] == '+' and name != '/dev/null':
+                        diff_file.new_path = name
+                        diff_file.old_path = diff_file.old_path or name
+                    elif line[0] == '-' and name != '/dev/null':
+                        diff_file.old_path = name
+                continue
+            kind = line[0]
+            if kind == '+':
+                diff_file.added.add(new_line)
+                new_line += 1
+            elif kind == '-':
+                diff_file.removed.add(old_line)
+                old_line += 1
+            elif kind != '\\':
+                old_line += 1
+                new_line += 1
+        if diff_file is not None:
+            self.__close(diff_file, hunk, len(text))
+
+    @staticmethod
+    def __close(diff_file: DiffFile, hunk: Optional[DiffHunk], end: int) -> None:
+        """
+        Set the end offsets of a parsed file block and its last hunk.
+        """
+        diff_file.end = end
+        if hunk is None:
+            diff_file.hunks_start = end
+        else:
+            hunk.end = end
+
+def _iter_lines(text: str, start: int, end: int) -> Iterator[str]:
+    """
+    Iterate over the lines of a part of a text, keeping line breaks.
+    """
+    while start < end:
+        line_end = text.find('\n', start, end)
+        line_end = end if line_end < 0 else line_end + 1
+        yield text[start:line_end]
+        start = line_end
+
+def _annotate_line(line: str, kind: str, number: int) -> str:
+    """
+    Prefix a hunk line with its line number.
+    """
+    if kind == '\\':
+        return f"    | {line}"
+    return f"{number:3} | {line}"
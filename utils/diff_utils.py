@@ -1,65 +1,174 @@
-from typing import Optional
-import re
+from dataclasses import dataclass
+from typing import Optional, Union
+import hashlib
 
-def split_diff(diff: str, max_length: int, ignore_files: Optional[list[str]] = None) -> list[str]:
+from utils.diff_index import DiffFile, DiffIndex
+from utils.token_utils import TokenEstimator, estimate_tokens
+
+@dataclass
+class SplitReport:
+    """
+    Statistics of a diff split into chunks.
+    
+    Attributes:
+        chunks (int): Count of chunks (LLM calls)
+        blocks (int): Count of file blocks packed into the chunks
+        total_tokens (int): Estimated tokens of all chunks
+        token_budget (int): Token budget of one chunk
+        fill_ratio (float): Share of the budget of all chunks filled with diff (0..1, above 1 if some block exceeds the budget)
+    """
+    chunks: int
+    blocks: int
+    total_tokens: int
+    token_budget: int
+    fill_ratio: float
+
+@dataclass
+class DiffChunk:
+    """
+    Chunk of a diff sent to the language model in one request.
+    
+    Attributes:
+        text (str): Diff text of the chunk
+        files (list[DiffFile]): Files (or pieces of files) in the chunk
     """
-    Split a git diff into chunks that are smaller than the specified maximum length.
+    text: str
+    files: list[DiffFile]
+
+    @property
+    def names(self) -> list[str]:
+        """Returns all file names of the chunk.
+        
+        Returns:
+            list[str]: Unique file names in order of the diff
+        """
+        return list(dict.fromkeys(name for diff_file in self.files for name in diff_file.names))
+
+def pack_diff(diff: Union[str, DiffIndex], token_budget: int, ignore_files: Optional[list[str]] = None,
+              estimator: TokenEstimator = estimate_tokens, overlap_hunks: int = 0, annotate: bool = False,
+              files: Optional[list[DiffFile]] = None) -> tuple[list[DiffChunk], SplitReport]:
+    """
+    Pack the file blocks of a git diff into as few chunks as possible within a token budget.
     
-    The function preserves the structure of the diff by keeping related changes together.
-    If a single block of changes exceeds the maximum length, it will be kept as a single chunk.
+    Blocks are packed with the first-fit-decreasing strategy (largest blocks first, each into the first chunk
+    with enough free space), which uses far fewer chunks than packing in diff order.
+    Inside a chunk the blocks keep their order from the diff. A block larger than the budget is split
+    at hunk boundaries first (see `split_diff_block`).
     
     Args:
-        diff (str): The git diff content to split
-        max_length (int): Maximum length for each chunk in characters
+        diff (Union[str, DiffIndex]): The git diff content to split, or its index
+        token_budget (int): Maximum estimated tokens for each chunk
         ignore_files (Optional[list[str]]): List of file names to exclude from the diff chunks
+        estimator (TokenEstimator): Function estimating tokens of a text
+        overlap_hunks (int): Count of trailing hunks of a split block repeated at the start of its next piece
+        annotate (bool): Prefix hunk lines with their line numbers (see `annotate_diff_with_line_numbers`)
+        files (Optional[list[DiffFile]]): Files of the index to pack (all files by default)
         
     Returns:
-        list[str]: List of diff chunks, each smaller than max_length
+        tuple[list[DiffChunk], SplitReport]: List of diff chunks and statistics of the split
     """
     if ignore_files is None:
         ignore_files = []
-    if not diff:
-        return []
-    blocks = []
-    current_block = []
-    lines = diff.splitlines(keepends=True)
-    for line in lines:
-        if line.startswith('diff --git'):
-            if current_block:
-                blocks.append(''.join(current_block))
-                current_block = []
-        current_block.append(line)
-    if current_block:
-        blocks.append(''.join(current_block))
-    chunks = []
-    current_chunk = []
-    current_size = 0
-
-    for block in blocks:
-        # Skip blocks for ignored files
-        files_in_block = get_files_from_diff(block)
-        if any( any(ignore_file in filename for filename in files_in_block) for ignore_file in ignore_files ):
-            continue
-            
-        block_len = len(block)
-        if block_len > max_length:
-            if current_chunk:
-                chunks.append(''.join(current_chunk))
-                current_chunk = []
-                current_size = 0
-            chunks.append(block)
+    index = diff if isinstance(diff, DiffIndex) else DiffIndex(diff)
+    blocks = [(diff_file, piece, size) for diff_file in (index.files if files is None else files)
+              if not is_ignored_file(diff_file, ignore_files)
+              for piece, size in index.split_file(diff_file, token_budget, estimator, overlap_hunks, annotate)]
+    bins: list[list[int]] = []
+    bin_sizes: list[int] = []
+    for block_index in sorted(range(len(blocks)), key=lambda i: blocks[i][2], reverse=True):
+        size = blocks[block_index][2]
+        for bin_index, bin_size in enumerate(bin_sizes):
+            if bin_size + size <= token_budget:
+                bins[bin_index].append(block_index)
+                bin_sizes[bin_index] += size
+                break
         else:
-            if current_size + block_len <= max_length:
-                current_chunk.append(block)
-                current_size += block_len
-            else:
-                if current_chunk:
-                    chunks.append(''.join(current_chunk))
-                current_chunk = [block]
-                current_size = block_len
-    if current_chunk:
-        chunks.append(''.join(current_chunk))
-    return chunks
+            bins.append([block_index])
+            bin_sizes.append(size)
+    bins = sorted((sorted(indexes) for indexes in bins), key=lambda indexes: indexes[0])
+    chunks = [DiffChunk(''.join(blocks[i][1] for i in indexes), list({id(blocks[i][0]): blocks[i][0] for i in indexes}.values()))
+              for indexes in bins]
+    total_tokens = sum(size for _, _, size in blocks)
+    fill_ratio = total_tokens / (token_budget * len(chunks)) if chunks and token_budget > 0 else 0.0
+    return chunks, SplitReport(len(chunks), len(blocks), total_tokens, token_budget, fill_ratio)
+
+def split_diff_block(diff_block: str, max_size: int, estimator: TokenEstimator = len, overlap_hunks: int = 0) -> list[str]:
+    """
+    Split a file block of a git diff which is larger than `max_size` into pieces at `@@` hunk boundaries.
+    
+    Every piece repeats the file header (`diff --git`, `---`, `+++` ...) and contains whole hunks, so each piece
+    is a valid diff and line numbers calculated from it (e.g. by `annotate_diff_with_line_numbers`) stay correct.
+    A single hunk larger than `max_size` is split into smaller hunks at line boundaries with recalculated headers.
+    
+    Args:
+        diff_block (str): File block of a git diff (see `DiffIndex.block`)
+        max_size (int): Maximum size of a piece, measured by `estimator`
+        estimator (TokenEstimator): Function measuring a text (characters by default)
+        overlap_hunks (int): Count of trailing hunks of a piece repeated at the start of the next piece as context
+        
+    Returns:
+        list[str]: Pieces of the block (the block itself if it fits or has no hunks)
+    """
+    index = DiffIndex(diff_block)
+    if len(index.files) != 1 or index.preamble_end > 0:
+        return [diff_block]
+    return [piece for piece, _ in index.split_file(index.files[0], max_size, estimator, overlap_hunks)]
+
+def is_ignored_file(diff_file: DiffFile, ignore_files: list[str]) -> bool:
+    """
+    Check whether a file of a diff index is ignored.
+    
+    Args:
+        diff_file (DiffFile): File of a diff index
+        ignore_files (list[str]): List of file names to exclude
+        
+    Returns:
+        bool: True if any file name of the file contains one of the ignored names
+    """
+    return any( any(ignore_file in filename for filename in diff_file.names) for ignore_file in ignore_files )
+
+def get_diff_fingerprint(index: DiffIndex, diff_file: DiffFile) -> str:
+    """
+    Calculate a fingerprint of a file of a git diff.
+    Only the file names and the hunks are hashed: the extended header (`index`, `new file mode`, `similarity index`...)
+    is missing from blocks built from the files API (see `PrFile.to_diff_block`), so it must not change the fingerprint.
+    
+    Args:
+        index (DiffIndex): Index of the git diff
+        diff_file (DiffFile): File of the index
+        
+    Returns:
+        str: SHA-256 hex digest of the file
+    """
+    digest = hashlib.sha256()
+    digest.update(f"{diff_file.old_path}\n{diff_file.new_path}\n".encode('utf-8'))
+    digest.update(index.text[diff_file.hunks_start:diff_file.end].encode('utf-8'))
+    return digest.hexdigest()
+
+def get_patch_id(index: DiffIndex, diff_file: DiffFile) -> str:
+    """
+    Calculate a stable identifier of the changes in a file of a git diff (similar to `git patch-id`).
+    
+    Only the file names and the added/removed lines of the hunks with whitespace removed are hashed, so the identifier
+    does not depend on line numbers, context lines or blob hashes. The same change rebased, force-pushed
+    or cherry-picked to another branch gets the same identifier.
+    
+    Args:
+        index (DiffIndex): Index of the git diff
+        diff_file (DiffFile): File of the index
+        
+    Returns:
+        str: SHA-256 hex digest of the normalized changes
+    """
+    digest = hashlib.sha256()
+    for name in (diff_file.old_path, diff_file.new_path, diff_file.rename_from, diff_file.rename_to):
+        digest.update(f"{name}\n".encode('utf-8'))
+    for hunk in diff_file.hunks:
+        # Lines are taken from hunk bodies, so a changed line starting with `--` or `++` is never taken for a file header
+        for line, kind, _ in index.walk(hunk):
+            if kind in '+-':
+                digest.update((kind + ''.join(line[1:].split())).encode('utf-8') + b'\n')
+    return digest.hexdigest()
 
 def get_files_from_diff(diff_text):
     """
@@ -71,18 +180,7 @@ def get_files_from_diff(diff_text):
     Returns:
         list[str]: List of unique file names found in the diff
     """
-    files = []
-    for line in diff_text.splitlines():
-        match = re.match(r"^diff --git a/(.*) b/(.*)$", line)
-        if match:
-            files.extend([match.group(1), match.group(2)])
-        match = re.match(r"^rename from (.*)$", line)
-        if match:
-            files.append(match.group(1))
-        match = re.match(r"^rename to (.*)$", line)
-        if match:
-            files.append(match.group(1))
-    return list(set(files))  # Remove duplicates
+    return DiffIndex(diff_text).names()
 
 def get_changed_lines(diff_text : str) -> dict:
     """
@@ -93,59 +191,10 @@ def get_changed_lines(diff_text : str) -> dict:
 
     Returns:
     dict: Dictionary where keys are file names, values are dictionaries with keys:
-    - 'added': list of added lines
-    - 'removed': list of removed lines
+    - 'added': added line numbers (`LineRanges`, a compact sorted set)
+    - 'removed': removed line numbers (`LineRanges`, a compact sorted set)
     """
-    file_changes = {}
-    current_file = None
-    current_hunk = None
-    
-    # Regular expressions
-    file_header_re = re.compile(r'^diff --git a/(.*?) b/(.*?)$', re.MULTILINE)
-    hunk_header_re = re.compile(r'^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@', re.MULTILINE)
-    changed_line_re = re.compile(r'^([+-])(?!\+\+ |--- )(.+)', re.MULTILINE)
-    
-    for line in diff_text.split('\n'):
-        # Check for start of new file
-        file_match = file_header_re.match(line)
-        if file_match:
-            current_file = file_match.group(2)
-            file_changes[current_file] = {'added': [], 'removed': []}
-            continue
-        
-        # Check for start of new hunk
-        hunk_match = hunk_header_re.match(line)
-        if hunk_match and current_file:
-            old_start = int(hunk_match.group(1))
-            new_start = int(hunk_match.group(3))
-            current_hunk = {
-                'old_line': old_start,
-                'new_line': new_start,
-                'current_old': old_start,
-                'current_new': new_start
-            }
-            continue
-        
-        # Analyze changed lines
-        if current_file and current_hunk:
-            line_type_match = changed_line_re.match(line)
-            if line_type_match:
-                line_type = line_type_match.group(1)
-                content = line_type_match.group(2)
-                
-                if line_type == '+':
-                    file_changes[current_file]['added'].append(current_hunk['new_line'])
-                    current_hunk['new_line'] += 1
-                elif line_type == '-':
-                    file_changes[current_file]['removed'].append(current_hunk['old_line'])
-                    current_hunk['old_line'] += 1
-            else:
-                # Normal line (no + or -) - increment both counters
-                if not line.startswith('---') and not line.startswith('+++'):
-                    current_hunk['old_line'] += 1
-                    current_hunk['new_line'] += 1
-    
-    return file_changes
+    return DiffIndex(diff_text).changed_lines()
 
 def annotate_diff_with_line_numbers(diff_text: str) -> str:
     """
@@ -157,61 +206,4 @@ def annotate_diff_with_line_numbers(diff_text: str) -> str:
     Returns:
         str: The diff text with line numbers added
     """
-    result = []
-    old_line = 0
-    new_line = 0
-    in_hunk = False
-    
-    for line in diff_text.split('\n'):
-        # Processing the beginning of a new file
-        if line.startswith('diff --git'):
-            result.append(line)
-            old_line = 0
-            new_line = 0
-            in_hunk = False
-            continue
-        
-        # Processing file headers (--- / +++)
-        if line.startswith('--- ') or line.startswith('+++ '):
-            result.append(line)
-            continue
-        
-        # Processing the beginning of the hunk
-        if line.startswith('@@ '):
-            match = re.match(r'@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@', line)
-            if match:
-                old_line = int(match.group(1))
-                new_line = int(match.group(3))
-            in_hunk = True
-            result.append(line)
-            continue
-        
-        if not in_hunk:
-            result.append(line)
-            continue
-        
-        # Context line (unchanged)
-        if line.startswith(' '):
-            # Context line (unchanged)
-            annotated = f"{new_line:3} | {line}"
-            old_line += 1
-            new_line += 1
-        elif line.startswith('-'):
-            # Deleted line (only in old file)
-            annotated = f"{old_line:3} | {line}"
-            old_line += 1
-            # Don't increment new_line for deleted lines
-        elif line.startswith('+'):
-            # Added line (only in new file)
-            annotated = f"{new_line:3} | {line}"
-            new_line += 1
-            # Don't increment old_line for added lines
-        elif line.startswith('\\'):
-            # Special line (No newline at end of file)
-            annotated = f"    | {line}"
-        else:
-            annotated = line
-        
-        result.append(annotated)
-    
-    return '\n'.join(result)
+    return DiffIndex(diff_text).annotate()
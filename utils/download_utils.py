@@ -0,0 +1,147 @@
+import codecs
+import io
+import logging
+import mmap
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+DEFAULT_ENCODING = "utf-8"
+CHUNK_SIZE = 64 * 1024
+
+logger = logging.getLogger(__name__)
+
+def get_declared_encoding(response: requests.Response) -> str:
+    """
+    Get the encoding declared by the `charset` of the `Content-Type` header.
+    
+    Unlike `response.text`, no charset detection is run over the body: diffs without
+    a declared charset are decoded as UTF-8.
+    
+    Args:
+        response (requests.Response): The response
+        
+    Returns:
+        str: Declared encoding, or UTF-8 if none (or an unknown one) is declared
+    """
+    content_type = response.headers.get("Content-Type", "")
+    for parameter in content_type.split(";")[1:]:
+        name, _, value = parameter.partition("=")
+        if name.strip().lower() == "charset" and value.strip():
+            encoding = value.strip().strip('"\'')
+            try:
+                codecs.lookup(encoding)
+                return encoding
+            except LookupError:
+                break
+    return DEFAULT_ENCODING
+
+def download_diff(response: requests.Response, spool_threshold: int, max_size: int) -> str:
+    """
+    Read a diff from a streamed response (`stream=True`) without buffering the whole body in memory twice.
+    
+    The body is spooled to memory and moved to a temporary file once it grows above `spool_threshold` bytes.
+    Above `max_size` bytes the download stops: the last incomplete file block is dropped and the remaining
+    files are skipped, so a huge pull request is reviewed partially instead of exhausting memory.
+    When the first file block alone is larger than `max_size`, it is kept, cut at its last complete line.
+    The body is decoded once with the declared encoding (see `get_declared_encoding`) into a single string,
+    so the memory used by the returned diff is bounded by `max_size`, not by `spool_threshold`.
+    
+    Args:
+        response (requests.Response): Streamed response with the diff
+        spool_threshold (int): Size (bytes) above which the body is spooled to a temporary file
+        max_size (int): Maximal size (bytes) of the diff
+        
+    Returns:
+        str: The diff content
+    """
+    encoding = get_declared_encoding(response)
+    spool = io.BytesIO()
+    spilled = False
+    size = 0
+    truncated = False
+    try:
+        try:
+            for data in response.iter_content(CHUNK_SIZE):
+                if size + len(data) > max_size:
+                    data = data[:max_size - size]
+                    truncated = True
+                if not spilled and size + len(data) > spool_threshold:
+                    spilled_file = tempfile.TemporaryFile()
+                    spilled_file.write(spool.getbuffer())
+                    spool, spilled = spilled_file, True
+                spool.write(data)
+                size += len(data)
+                if truncated:
+                    break
+        finally:
+            response.close()
+        if size == 0:
+            return ""
+        spool.flush()
+        # Spilled bodies are read through a memory map instead of loading the file into memory once more
+        source = mmap.mmap(spool.fileno(), 0, access=mmap.ACCESS_READ) if spilled else spool.getvalue()
+        try:
+            end = size
+            if truncated:
+                # Keep only complete file blocks
+                end = source.rfind(b"\ndiff --git ", 0, size) + 1
+                if end == 0:
+                    # The first file block alone is larger than the limit: keep its complete lines
+                    end = source.rfind(b"\n", 0, size) + 1 or size
+                logger.warning("Diff %s is larger than %s bytes. Review is limited to the first %s bytes, the remaining files are skipped",
+                               response.url, max_size, end)
+            decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+            parts = [decoder.decode(source[offset:min(offset + CHUNK_SIZE, end)]) for offset in range(0, end, CHUNK_SIZE)]
+            parts.append(decoder.decode(b"", final=True))
+            return "".join(parts)
+        finally:
+            if spilled:
+                source.close()
+    finally:
+        spool.close()
+
+def get_paginated(http, url: str, headers: dict, params: dict, max_workers: int = 4, timeout: int = 60 * 2) -> list:
+    """
+    Get all items of a paginated JSON list endpoint (GitHub and Gitea style `page` parameter and `Link` header).
+    
+    The first page is requested alone. When its `Link` header announces the last page,
+    the remaining pages are requested in parallel.
+    
+    Args:
+        http: Object sending requests with a `get` method (`requests`, a `requests.Session` or an `HttpSessionPool`)
+        url (str): Endpoint url
+        headers (dict): Request headers
+        params (dict): Query parameters (page size etc.)
+        max_workers (int): Maximal count of pages requested in parallel
+        timeout (int): Timeout (seconds) of one request
+        
+    Returns:
+        list: Items of all pages in order
+        
+    Raises:
+        requests.HTTPError: A page request failed
+    """
+    def get_page(page: int) -> requests.Response:
+        response = http.get(url, headers=headers, params={**params, "page": page}, timeout=timeout)
+        response.raise_for_status()
+        return response
+
+    first_page = get_page(1)
+    items = list(first_page.json() or [])
+    last_url = first_page.links.get("last", {}).get("url")
+    last_page = int(parse_qs(urlparse(last_url).query).get("page", ["1"])[0]) if last_url else 1
+    if last_page > 1:
+        with ThreadPoolExecutor(max_workers=min(max_workers, last_page - 1), thread_name_prefix="Pages") as executor:
+            for response in executor.map(get_page, range(2, last_page + 1)):
+                items.extend(response.json() or [])
+        return items
+    # No last page announced: follow `next` links one by one
+    response, page = first_page, 1
+    while "next" in response.links:
+        page += 1
+        response = get_page(page)
+        items.extend(response.json() or [])
+    return items
@@ -0,0 +1,168 @@
+from array import array
+from bisect import bisect_right
+from typing import Iterator, Optional
+
+class LineRanges:
+    """
+    Sorted set of line numbers stored as closed intervals in two integer arrays.
+
+    Changed lines of a diff mostly come in runs, so a file with thousands of changed lines
+    needs only a few intervals. Membership, nearest line and position lookups use binary search.
+    The class supports `len`, `in`, iteration, indexing and `index` like a sorted list of line numbers.
+    """
+    __slots__ = ("_starts", "_ends", "_positions", "_count")
+
+    def __init__(self, lines: Optional[list[int]] = None):
+        """
+        Create a set of line numbers.
+
+        Args:
+            lines (Optional[list[int]]): Initial line numbers, in any order
+        """
+        self._starts = array('q')
+        self._ends = array('q')
+        self._positions: Optional[array] = None
+        self._count = 0
+        for line in lines or []:
+            self.add(line)
+
+    def add(self, line: int) -> None:
+        """
+        Add a line number. Adding in ascending order (the order of a diff) is O(1).
+
+        Args:
+            line (int): Line number to add
+        """
+        if self._ends and line == self._ends[-1] + 1:
+            self._ends[-1] = line
+        elif not self._ends or line > self._ends[-1]:
+            self._starts.append(line)
+            self._ends.append(line)
+        else:
+            self.__insert(line)
+            return
+        self._count += 1
+        self._positions = None
+
+    def update(self, other: "LineRanges") -> None:
+        """
+        Add all line numbers of another set.
+
+        Args:
+            other (LineRanges): Line numbers to add
+        """
+        for start, end in other.ranges():
+            for line in range(start, end + 1):
+                self.add(line)
+
+    def ranges(self) -> Iterator[tuple[int, int]]:
+        """
+        Iterate over the intervals.
+
+        Yields:
+            tuple[int, int]: First and last line number of an interval
+        """
+        return zip(self._starts, self._ends)
+
+    def nearest(self, line: int) -> Optional[int]:
+        """
+        Find the line number of the set closest to a line (the lower one on a tie).
+
+        Args:
+            line (int): Line number to look up
+
+        Returns:
+            Optional[int]: Closest line number, or None if the set is empty
+        """
+        if not self._starts:
+            return None
+        i = bisect_right(self._starts, line) - 1
+        if i >= 0 and line <= self._ends[i]:
+            return line
+        below = self._ends[i] if i >= 0 else None
+        above = self._starts[i + 1] if i + 1 < len(self._starts) else None
+        if above is None or (below is not None and line - below <= above - line):
+            return below
+        return above
+
+    def index(self, line: int) -> int:
+        """
+        Get the position of a line number in ascending order.
+
+        Args:
+            line (int): Line number of the set
+
+        Returns:
+            int: Zero based position
+
+        Raises:
+            ValueError: The line number is not in the set
+        """
+        i = bisect_right(self._starts, line) - 1
+        if i < 0 or line > self._ends[i]:
+            raise ValueError(f"{line} is not in line ranges")
+        return self.__positions()[i] + line - self._starts[i]
+
+    def __getitem__(self, position: int) -> int:
+        if position < 0:
+            position += self._count
+        if not 0 <= position < self._count:
+            raise IndexError("line ranges index out of range")
+        positions = self.__positions()
+        i = bisect_right(positions, position) - 1
+        return self._starts[i] + position - positions[i]
+
+    def __contains__(self, line: int) -> bool:
+        i = bisect_right(self._starts, line) - 1
+        return i >= 0 and line <= self._ends[i]
+
+    def __iter__(self) -> Iterator[int]:
+        for start, end in self.ranges():
+            yield from range(start, end + 1)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, LineRanges):
+            return self._starts == other._starts and self._ends == other._ends
+        return list(self) == list(other)
+
+    def __repr__(self) -> str:
+        return f"LineRanges({', '.join(f'{s}-{e}' if s != e else str(s) for s, e in self.ranges())})"
+
+    def __positions(self) -> array:
+        """
+        Get the position of the first line of every interval, calculated on first use after a change.
+        """
+        if self._positions is None:
+            self._positions = array('q')
+            total = 0
+            for start, end in self.ranges():
+                self._positions.append(total)
+                total += end - start + 1
+        return self._positions
+
+    def __insert(self, line: int) -> None:
+        """
+        Add a line number before the last interval, merging adjacent intervals.
+        """
+        i = bisect_right(self._starts, line) - 1
+        if i >= 0 and line <= self._ends[i]:
+            return
+        if i >= 0 and line == self._ends[i] + 1:
+            self._ends[i] = line
+        elif i + 1 < len(self._starts) and line == self._starts[i + 1] - 1:
+            self._starts[i + 1] = line
+        else:
+            self._starts.insert(i + 1, line)
+            self._ends.insert(i + 1, line)
+            i += 1
+        # Join with the next interval if the gap is closed
+        j = i if i >= 0 and self._ends[i] >= line else i + 1
+        if j + 1 < len(self._starts) and self._ends[j] + 1 == self._starts[j + 1]:
+            self._ends[j] = self._ends[j + 1]
+            del self._starts[j + 1]
+            del self._ends[j + 1]
+        self._count += 1
+        self._positions = None
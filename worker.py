@@ -1,14 +1,21 @@
+from datetime import datetime, timezone
 import threading
-import time
 import logging
+import time
 
 from contracts.pr_url import PrUrl
 from contracts.review_task import ReviewTask
+from services.comment_publisher import CommentPublisher
 from services.git_service import GitService
 from services.gitea_service import GiteaService
 from services.github_service import GithubService
+from services.metrics_service import MetricsService
+from services.ai.usage_tracker import UsageTracker
 from services.queue.task_queue import TaskQueue
+from services.review_history_service import ReviewHistoryService
 from services.review_service import ReviewService
+from services.tracing_service import TracingService
+from utils.diff_index import DiffIndex
 
 class Worker(threading.Thread):
     """
@@ -17,7 +24,15 @@ class Worker(threading.Thread):
     This worker continuously processes tasks from a queue, performing code reviews
     using the appropriate Git service and review service.
     """
-    def __init__(self, gitea_service: GiteaService, github_service: GithubService, review_service: ReviewService, queue: TaskQueue):
+    DEQUEUE_TIMEOUT: int = 5 # Block on the queue at most 5 seconds, so a stop request is noticed quickly
+    CLOCK_SKEW: int = 5 * 60
+    NO_CHANGES_COMMENT: str = "🤖 AI Code Review: no changes since the last review. Use `/start_review --full` to review the whole Pull Request again."
+    FAILED_FILES_COMMENT: str = "🤖 AI Code Review: review of some files failed, they are not reviewed:\n* {files}\n\nWrite `/start_review` again to review them."
+    NOTHING_TO_REVIEW_COMMENT: str = "🤖 AI Code Review: nothing to review. The Pull Request has no changes, or all changed files are ignored."
+
+    def __init__(self, gitea_service: GiteaService, github_service: GithubService, review_service: ReviewService, queue: TaskQueue,
+                review_history_service: ReviewHistoryService, comment_publisher: CommentPublisher,
+                metrics: MetricsService, tracing: TracingService, name: str = None):
         """
         Initialize the worker with required services and task queue.
         
@@ -26,63 +41,186 @@ class Worker(threading.Thread):
             github_service (GithubService): Service for GitHub interactions
             review_service (ReviewService): Service for performing code reviews
             queue (TaskQueue): Queue containing review tasks
+            review_history_service (ReviewHistoryService): Service storing completed reviews for incremental re-review
+            comment_publisher (CommentPublisher): Publisher merging and posting review comments
+            metrics (MetricsService): Collector of queue wait, stage durations and errors
+            tracing (TracingService): Writer of review traces
+            name (str, optional): Thread name, used to distinguish workers of a pool in logs
         """
-        super().__init__(daemon=True)
+        super().__init__(name=name, daemon=True)
         self.gitea_service = gitea_service
         self.github_service = github_service
         self.review_service = review_service
         self.queue = queue
+        self.review_history_service = review_history_service
+        self.comment_publisher = comment_publisher
+        self.metrics = metrics
+        self.tracing = tracing
         self.logger = logging.getLogger(Worker.__name__)
+        self._stop_event = threading.Event()
+        self._busy = False
+
+    @property
+    def is_busy(self) -> bool:
+        """Returns whether the worker is processing a task right now.
+        
+        Returns:
+            bool: True if a task is in progress, False if the worker is idle
+        """
+        return self._busy
+
+    @property
+    def is_stopping(self) -> bool:
+        """Returns whether the worker was asked to exit.
+        
+        Returns:
+            bool: True if `stop` was called, False otherwise
+        """
+        return self._stop_event.is_set()
+
+    def stop(self) -> None:
+        """
+        Ask the worker to exit after the current task is finished.
+        """
+        self._stop_event.set()
 
     def run(self):
         """
         Main worker loop that processes tasks from the queue.
         
         Continuously dequeues tasks and processes them using the appropriate Git service.
-        Handles errors and implements retry logic.
+        Errors are isolated to the failed task, so the worker keeps serving the queue.
         """
-        while True:
+        while not self._stop_event.is_set():
             try:
-                review_task: ReviewTask  = self.queue.dequeue()
+                review_task: ReviewTask  = self.queue.dequeue(timeout=self.DEQUEUE_TIMEOUT)
                 if review_task is None:
-                    time.sleep(20) # Check for new tasks every 20 seconds. Needs for operative task processing
                     continue
-                if review_task.git_service == "gitea":
-                    self.__process_review(self.gitea_service, review_task)
-                elif review_task.git_service == "github":
-                    self.__process_review(self.github_service, review_task)
+                self._busy = True
+                dequeued_at = time.time()
+                self.metrics.observe("queue_wait_seconds", max(dequeued_at - review_task.enqueued_at, 0), {"git_service": review_task.git_service})
+                completed = True
+                with self.tracing.trace(review_task.trace_id, review_task.pull_request_url):
+                    self.tracing.add_span("queue_wait", "queue", review_task.enqueued_at, dequeued_at)
+                    with self.tracing.span("review", "review", git_service=review_task.git_service, full_review=review_task.full_review):
+                        if review_task.git_service == "gitea":
+                            completed = self.__process_review(self.gitea_service, review_task)
+                        elif review_task.git_service == "github":
+                            completed = self.__process_review(self.github_service, review_task)
+                        else:
+                            self.logger.error("Unknown git service: %s", review_task.git_service)
+                self.metrics.inc("reviews", {"git_service": review_task.git_service, "result": "completed" if completed else "failed"})
+                if completed:
+                    self.queue.acknowledge(review_task)
                 else:
-                    self.logger.error("Unknown git service: %s", review_task.git_service)
+                    self.queue.release(review_task)
             except Exception as e:
-                self.logger.error("Error in worker thread: %s", e, exc_info=True)
-                time.sleep(60 * 5) # Wait longer after an error
-            time.sleep(20) # Check for new tasks every 20 seconds. Needs for operative task processing
+                self.logger.error("Error in worker thread %s: %s", self.name, e, exc_info=True)
+            finally:
+                self._busy = False
 
-    def __process_review(self, service: GitService, review_task: ReviewTask) -> None:
+    def __publish(self, service: GitService, pull_request: PrUrl, review_task: ReviewTask, comments: list[str], kind: str) -> None:
+        """
+        Post comments of a review task.
+        
+        The publication id is derived from the trace id of the task, which is kept when the task is redelivered,
+        so comments posted by a failed attempt are not posted again by the next one.
+        
+        Args:
+            service (GitService): The Git service of the pull request
+            pull_request (PrUrl): The pull request
+            review_task (ReviewTask): The review task
+            comments (list[str]): Comment texts in order
+            kind (str): Kind of the comments, distinguishing publications of one task
+        """
+        publication_id = f"{review_task.trace_id}:{kind}" if review_task.trace_id else None
+        # Comments of earlier attempts were posted after the task was enqueued; the margin covers clock skew with the git server
+        since = datetime.fromtimestamp(review_task.enqueued_at - self.CLOCK_SKEW, timezone.utc)
+        with self.metrics.stage("publish", service.NAME), self.tracing.span("publish_comments", "git"):
+            self.comment_publisher.publish(service, pull_request, comments, publication_id, since)
+
+    def __process_review(self, service: GitService, review_task: ReviewTask) -> bool:
         """
         Process a single review task.
         
         Args:
             service (GitService): The Git service to use for the review
             review_task (ReviewTask): The review task to process
+
+        Returns:
+            bool: False if the review failed and the task should be retried, True otherwise
         """
         if not self.review_service.is_comment_review_enabled and not self.review_service.is_conversation_review_enabled:
             self.logger.warning("All review methods disabled. Review can't be completed. Ignoring event")
-            return
+            return True
         
         try:
             pull_request = PrUrl.create_from_url(review_task.pull_request_url)
             self.logger.info("Start review (%s) %s/%s #%s", review_task.git_service, pull_request.owner, pull_request.repo, pull_request.pr_number)
-            diff = service.get_pr_diff(pull_request)
-            self.logger.info("Send diff to LLM for review")
-            if self.review_service.is_comment_review_enabled:
-                review_batch = self.review_service.review_pull_request(diff, review_task.user_message)
-                for review in review_batch:
-                    service.post_comment(pull_request, review)
-            if self.review_service.is_conversation_review_enabled:
-                per_file_review_batch = self.review_service.per_file_review_pull_request(diff)
-                service.create_review(pull_request, per_file_review_batch)
-            self.logger.info("Review completed")
+            # Token usage of the language model is attributed to the repository (the context is copied into LLM threads)
+            with UsageTracker.repository(f"{pull_request.owner}/{pull_request.repo}"):
+                pr_key = review_task.coalesce_key
+                last_review = None if review_task.full_review else self.review_history_service.get_last_review(pr_key)
+                # Metadata is requested once per task; later steps (history, publishing) reuse it
+                with self.metrics.stage("metadata", service.NAME), self.tracing.span("get_pr_metadata", "git"):
+                    pr_metadata = service.get_pr_metadata(pull_request)
+                self.logger.info("Pull request head=%s, state=%s, draft=%s, +%s/-%s lines in %s files", pr_metadata.head_sha, pr_metadata.state,
+                                 pr_metadata.draft, pr_metadata.additions, pr_metadata.deletions, pr_metadata.changed_files)
+                head_sha = pr_metadata.head_sha
+                if last_review is not None and last_review.head_sha == head_sha:
+                    if not review_task.user_message:
+                        self.logger.info("No new commits since last review (%s). Skip review", head_sha)
+                        self.__publish(service, pull_request, review_task, [self.NO_CHANGES_COMMENT], "status")
+                        return True
+                    # New instructions from the user apply to the whole pull request, as with `--full`
+                    self.logger.info("No new commits since last review (%s), but the user asked a question. Review the whole pull request", head_sha)
+                    last_review = None
+                # Ignored files are filtered by the changed files list, before anything is downloaded
+                with self.metrics.stage("diff_fetch", service.NAME), self.tracing.span("get_pr_review_diff", "git"):
+                    diff = service.get_pr_review_diff(pull_request, self.review_service.ignore_files)
+                if diff is None:
+                    raise ValueError("Pull request diff is not available")
+                # The diff is parsed once; history and review services work on the same index
+                with self.tracing.span("diff_index", "diff", size=len(diff)):
+                    diff_index = DiffIndex(diff)
+                if not diff_index.files:
+                    # Nothing was reviewed, so nothing is recorded: files may stop being ignored later
+                    self.logger.info("No files to review (all changed files are ignored or the diff is empty). Skip review")
+                    self.__publish(service, pull_request, review_task, [self.NOTHING_TO_REVIEW_COMMENT], "status")
+                    return True
+                with self.tracing.span("get_changed_files", "diff", incremental=last_review is not None):
+                    review_files = diff_index.files if last_review is None else self.review_history_service.get_changed_files(last_review, diff_index)
+                if not review_files:
+                    self.logger.info("No changed files since last review. Skip review")
+                    self.__publish(service, pull_request, review_task, [self.NO_CHANGES_COMMENT], "status")
+                    self.review_history_service.record_review(pr_key, head_sha, diff_index)
+                    return True
+                self.logger.info("Send diff to LLM for review")
+                failed_paths = []
+                if self.review_service.is_comment_review_enabled:
+                    with self.tracing.span("review_pull_request", "review"):
+                        review_batch = self.review_service.review_pull_request(diff_index, review_task.user_message, review_files)
+                    failed_paths.extend(review_batch.failed_paths)
+                    self.__publish(service, pull_request, review_task, review_batch.results, "review")
+                if self.review_service.is_conversation_review_enabled:
+                    with self.tracing.span("per_file_review_pull_request", "review"):
+                        per_file_review_batch = self.review_service.per_file_review_pull_request(diff_index, review_files, review_task.full_review)
+                    failed_paths.extend(per_file_review_batch.failed_paths)
+                    # A rejected review raises: nothing is recorded and the task is released for retry
+                    with self.metrics.stage("publish", service.NAME), self.tracing.span("create_review", "git"):
+                        service.create_review(pull_request, per_file_review_batch.results, pr_metadata)
+                reviewed_files, reviewed_sha = diff_index.files, head_sha
+                if failed_paths:
+                    # Files with a failed review are not recorded, so the next `/start_review` sends them again.
+                    # Without the head SHA the next request is not skipped as "no new commits"
+                    failed_paths = list(dict.fromkeys(failed_paths))
+                    self.logger.warning("Review failed for %s files: %s", len(failed_paths), ", ".join(failed_paths))
+                    failed_files = "\n* ".join(failed_paths)
+                    self.__publish(service, pull_request, review_task, [self.FAILED_FILES_COMMENT.format(files=failed_files)], "failed_files")
+                    reviewed_files, reviewed_sha = [diff_file for diff_file in diff_index.files if diff_file.path not in failed_paths], None
+                self.review_history_service.record_review(pr_key, reviewed_sha, diff_index, reviewed_files)
+                self.logger.info("Review completed")
+                return True
         except Exception as e:
             self.logger.error("Error during review process for PR (%s) %s: %s", review_task.git_service, review_task.pull_request_url, e, exc_info=True)
-            time.sleep(60 * 5) # Wait longer after an error
+            return False
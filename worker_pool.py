@@ -0,0 +1,136 @@
+import threading
+import time
+import logging
+
+from configuration.worker_configuration import WorkerConfiguration
+from services.comment_publisher import CommentPublisher
+from services.gitea_service import GiteaService
+from services.github_service import GithubService
+from services.metrics_service import MetricsService
+from services.queue.task_queue import TaskQueue
+from services.review_history_service import ReviewHistoryService
+from services.review_service import ReviewService
+from services.tracing_service import TracingService
+from worker import Worker
+
+class WorkerPool(threading.Thread):
+    """
+    Pool of worker threads sharing one task queue.
+
+    The pool keeps at least `min_workers` workers alive. When autoscaling is enabled,
+    it periodically sizes the pool to the demand (busy workers plus tasks ready to be dequeued), starting
+    additional workers (up to `max_workers`) or retiring idle ones (down to `min_workers`).
+    A retired worker stays in the pool until its thread exits: it may still receive a task
+    from a pending `dequeue` and finishes it before exiting.
+    A worker which failed on a task keeps running, so one broken review never blocks the others.
+    """
+    def __init__(self, configuration: WorkerConfiguration, gitea_service: GiteaService, github_service: GithubService,
+                review_service: ReviewService, queue: TaskQueue, review_history_service: ReviewHistoryService,
+                comment_publisher: CommentPublisher, metrics: MetricsService,
+                tracing: TracingService):
+        """
+        Initialize the worker pool with required services and task queue.
+
+        Args:
+            configuration (WorkerConfiguration): Pool size and autoscaling settings
+            gitea_service (GiteaService): Service for Gitea interactions
+            github_service (GithubService): Service for GitHub interactions
+            review_service (ReviewService): Service for performing code reviews
+            queue (TaskQueue): Queue containing review tasks
+            review_history_service (ReviewHistoryService): Service storing completed reviews for incremental re-review
+            comment_publisher (CommentPublisher): Publisher merging and posting review comments
+            metrics (MetricsService): Collector of review metrics, shared with the workers
+            tracing (TracingService): Writer of review traces, shared with the workers
+        """
+        super().__init__(name="WorkerPool", daemon=True)
+        self.configuration = configuration
+        self.gitea_service = gitea_service
+        self.github_service = github_service
+        self.review_service = review_service
+        self.queue = queue
+        self.review_history_service = review_history_service
+        self.comment_publisher = comment_publisher
+        self.metrics = metrics
+        self.tracing = tracing
+        self.logger = logging.getLogger(WorkerPool.__name__)
+        self._workers: list[Worker] = []
+        self._lock = threading.Lock()
+        self._worker_counter = 0
+
+    @property
+    def size(self) -> int:
+        """Returns the number of alive workers.
+
+        Returns:
+            int: Count of running worker threads
+        """
+        with self._lock:
+            return len([w for w in self._workers if w.is_alive()])
+
+    @property
+    def busy(self) -> int:
+        """Returns the number of workers processing a task right now.
+
+        Returns:
+            int: Count of busy worker threads
+        """
+        with self._lock:
+            return len([w for w in self._workers if w.is_alive() and w.is_busy])
+
+    def run(self):
+        """
+        Supervisor loop of the pool.
+
+        Starts the minimal set of workers, replaces workers that died unexpectedly
+        and, if enabled, scales the pool by the tasks ready in the queue.
+        """
+        self.logger.info("Starting worker pool (min=%s, max=%s, autoscale=%s)",
+                         self.configuration.min_workers, self.configuration.max_workers, self.configuration.autoscale)
+        while True:
+            try:
+                self.__scale()
+            except Exception as e:
+                self.logger.error("Error in worker pool supervisor: %s", e, exc_info=True)
+            time.sleep(self.configuration.scale_interval)
+
+    def __scale(self) -> None:
+        """
+        Bring the number of workers in line with the configuration and the tasks ready in the queue.
+        """
+        with self._lock:
+            self._workers = [w for w in self._workers if w.is_alive()]
+            # Retired workers finish their task but no longer serve the queue
+            active = [w for w in self._workers if not w.is_stopping]
+            alive = len(active)
+            target = self.configuration.min_workers
+            if self.configuration.autoscale:
+                busy = len([w for w in active if w.is_busy])
+                # Follow-ups waiting for a review in progress and delayed retries need no worker yet
+                demand = busy + self.queue.ready_size()
+                target = max(self.configuration.min_workers, min(self.configuration.max_workers, demand))
+            for _ in range(target - alive):
+                self.__start_worker()
+            if target < alive:
+                self.__retire_idle_workers(alive - target)
+
+    def __start_worker(self) -> None:
+        """
+        Create and start one more worker. Must be called under the pool lock.
+        """
+        self._worker_counter += 1
+        worker = Worker(self.gitea_service, self.github_service, self.review_service, self.queue, self.review_history_service,
+                        self.comment_publisher, self.metrics, self.tracing, name=f"Worker-{self._worker_counter}")
+        worker.start()
+        self._workers.append(worker)
+        self.logger.info("Worker %s started. Pool size=%s", worker.name, len(self._workers))
+
+    def __retire_idle_workers(self, count: int) -> None:
+        """
+        Stop up to `count` idle workers. Must be called under the pool lock.
+
+        Args:
+            count (int): Maximal number of workers to stop
+        """
+        for worker in [w for w in self._workers if not w.is_stopping and not w.is_busy][:count]:
+            worker.stop()
+            self.logger.info("Worker %s retired. Pool size=%s", worker.name, len([w for w in self._workers if not w.is_stopping]))